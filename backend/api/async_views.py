@@ -0,0 +1,236 @@
+"""Асинхронные представления для чтения рецептов, тегов и ингредиентов.
+
+Подключаются вместо маршрутов ViewSet для GET-запросов при включённой
+настройке ASGI. Аутентификация и фильтры (DRF и django-filter
+синхронные) выполняются через ``sync_to_async``, выборки — асинхронным
+ORM. Наборы идентификаторов для флагов ``is_favorited``,
+``is_in_shopping_cart`` и ``is_subscribed`` загружаются заранее, поэтому
+сериализация идёт в цикле событий без обращений к базе.
+"""
+
+import math
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseRedirect
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipes.models import Recipe
+
+from . import catalog_segment, catalogs, facets
+from .fieldsets import recipe_fields
+from .id_sets import aload_id_sets
+from .normalized import is_normalized, side_loaded
+from .pagination import PaginatorWithLimit
+from .serializers import IngredientSerializer, RecipeSerializer, TagSerializer
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+
+def _render(data, status=200):
+    """JSON-ответ, совпадающий с ответом DRF."""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    response = HttpResponse(
+        renderer.render(data), status=status, content_type=content_type
+    )
+    response['Vary'] = 'Accept'
+    return response
+
+
+def _render_error(request, error):
+    """Ответ с ошибкой API так же, как в обработчике исключений DRF."""
+    data = error.detail
+    if not isinstance(data, (list, dict)):
+        data = {'detail': data}
+    response = _render(data, status=error.status_code)
+    if isinstance(error, exceptions.AuthenticationFailed):
+        response['WWW-Authenticate'] = (
+            request.authenticators[0].authenticate_header(request)
+        )
+    return response
+
+
+def read_view(handler, sync_view):
+    """Отдаёт GET-запросы ``handler``, остальные — ``sync_view``.
+
+    Ошибки API превращаются в такие же ответы, как у DRF.
+    """
+    @wraps(handler)
+    async def view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+        drf_request = Request(request, authenticators=[
+            authentication_class()
+            for authentication_class
+            in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ])
+        try:
+            return await handler(drf_request, *args, **kwargs)
+        except exceptions.APIException as error:
+            return _render_error(drf_request, error)
+
+    # csrf_exempt в Django 4.2 не поддерживает асинхронные представления.
+    view.csrf_exempt = True
+    return view
+
+
+@sync_to_async
+def _authenticate(request):
+    """Аутентифицирует запрос так же, как DRF перед вызовом действия."""
+    return request.user
+
+
+@sync_to_async
+def _filtered_queryset(viewset, request, action):
+    """Аутентифицирует запрос и строит queryset так же, как ViewSet."""
+    request.user  # Аутентификация выполняется при первом обращении.
+    view = viewset(
+        request=request, action=action, format_kwarg=None, args=(), kwargs={}
+    )
+    return view.filter_queryset(view.get_queryset())
+
+
+async def _get_object(queryset, pk):
+    """Возвращает объект по первичному ключу или 404."""
+    obj = await queryset.filter(pk=pk).afirst()
+    if obj is None:
+        raise exceptions.NotFound
+    return obj
+
+
+async def _paginate(request, queryset):
+    """Страница queryset и ссылки в формате PaginatorWithLimit."""
+    paginator = PaginatorWithLimit()
+    page_size = paginator.get_page_size(request)
+    count = await queryset.acount()
+    num_pages = max(1, math.ceil(count / page_size))
+    page_number = request.query_params.get(paginator.page_query_param, 1)
+    if page_number in paginator.last_page_strings:
+        page_number = num_pages
+    try:
+        page_number = int(page_number)
+    except (TypeError, ValueError):
+        raise exceptions.NotFound(paginator.invalid_page_message)
+    if not 1 <= page_number <= num_pages:
+        raise exceptions.NotFound(paginator.invalid_page_message)
+    offset = (page_number - 1) * page_size
+    objects = [obj async for obj in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    previous = None
+    if page_number == 2:
+        previous = remove_query_param(url, paginator.page_query_param)
+    elif page_number > 2:
+        previous = replace_query_param(
+            url, paginator.page_query_param, page_number - 1
+        )
+    return objects, {
+        'count': count,
+        'next': replace_query_param(
+            url, paginator.page_query_param, page_number + 1
+        ) if page_number < num_pages else None,
+        'previous': previous,
+    }
+
+
+def _recipe_context(request, normalized=False):
+    """Контекст RecipeSerializer с полями, выбранными в запросе."""
+    return {
+        'request': request,
+        'recipe_fields': recipe_fields(
+            request, RecipeSerializer.Meta.fields
+        ),
+        'normalized': normalized,
+    }
+
+
+async def _prepare_segment(recipes, context):
+    """Готовит api.catalog_segment к сериализации ингредиентов рецептов."""
+    fields = context['recipe_fields']
+    if fields is None or 'ingredients' in fields:
+        await catalog_segment.aprepare(
+            item.ingredient_id
+            for recipe in recipes
+            for item in recipe.recipe_ingredients.all()
+        )
+
+
+async def recipe_list(request):
+    """Список рецептов с фильтрами RecipeFilter."""
+    queryset = await _filtered_queryset(RecipeViewSet, request, 'list')
+    recipes, links = await _paginate(request, queryset)
+    await aload_id_sets(request)
+    context = _recipe_context(request, is_normalized(request))
+    await _prepare_segment(recipes, context)
+    data = {
+        **links,
+        'results': RecipeSerializer(recipes, many=True, context=context).data,
+    }
+    if context['normalized']:
+        data.update(side_loaded(recipes, context))
+    if facets.is_requested(request):
+        data['facets'] = await sync_to_async(facets.recipe_facets)(request)
+    return _render(data)
+
+
+async def recipe_detail(request, pk):
+    """Рецепт по идентификатору."""
+    queryset = await _filtered_queryset(RecipeViewSet, request, 'retrieve')
+    recipe = await _get_object(queryset, pk)
+    await aload_id_sets(request)
+    context = _recipe_context(request)
+    await _prepare_segment([recipe], context)
+    return _render(RecipeSerializer(recipe, context=context).data)
+
+
+async def short_link_redirect(request, short_link):
+    """Перенаправление по короткой ссылке на рецепт."""
+    await _authenticate(request)
+    recipe = await Recipe.objects.filter(
+        short_link=short_link
+    ).only('pk').afirst()
+    if recipe is None:
+        raise exceptions.NotFound
+    return HttpResponseRedirect(f'/recipes/{recipe.pk}/')
+
+
+async def tag_list(request):
+    """Список тегов."""
+    queryset = await _filtered_queryset(TagViewSet, request, 'list')
+    if not request.query_params:
+        catalog = await catalogs.aget(catalogs.TAGS, queryset, TagSerializer)
+        return catalog.response(request)
+    tags = [tag async for tag in queryset]
+    return _render(TagSerializer(tags, many=True).data)
+
+
+async def tag_detail(request, pk):
+    """Тег по идентификатору."""
+    queryset = await _filtered_queryset(TagViewSet, request, 'retrieve')
+    return _render(TagSerializer(await _get_object(queryset, pk)).data)
+
+
+async def ingredient_list(request):
+    """Список ингредиентов с поиском по началу названия."""
+    queryset = await _filtered_queryset(IngredientViewSet, request, 'list')
+    if not request.query_params:
+        catalog = await catalogs.aget(
+            catalogs.INGREDIENTS, queryset, IngredientSerializer
+        )
+        return catalog.response(request)
+    ingredients = [ingredient async for ingredient in queryset]
+    return _render(IngredientSerializer(ingredients, many=True).data)
+
+
+async def ingredient_detail(request, pk):
+    """Ингредиент по идентификатору."""
+    queryset = await _filtered_queryset(
+        IngredientViewSet, request, 'retrieve'
+    )
+    return _render(
+        IngredientSerializer(await _get_object(queryset, pk)).data
+    )
@@ -0,0 +1,127 @@
+"""Аутентификация по токену с кэшированием пользователя."""
+
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from . import generations
+
+
+class TTLCache:
+    """Ограниченный по размеру кэш процесса с вытеснением LRU и TTL."""
+
+    def __init__(self, max_size, timeout):
+        """Создаёт пустой кэш."""
+        self.max_size = max_size
+        self.timeout = timeout
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Значение по ключу или None, если его нет или оно устарело."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Сохраняет значение, вытесняя самые давние."""
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.timeout, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        """Удаляет значение."""
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        """Очищает кэш."""
+        with self._lock:
+            self._items.clear()
+
+
+local_cache = TTLCache(
+    settings.TOKEN_CACHE_MAX_SIZE, settings.TOKEN_CACHE_TIMEOUT
+)
+
+
+def _cache_key(key):
+    """Ключ кэша для токена; сам токен в ключах не хранится."""
+    return f'auth-token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def invalidate_tokens(keys):
+    """Сбрасывает закэшированных пользователей для токенов ``keys``.
+
+    Поколения токенов меняются после фиксации транзакции.
+    """
+    generations.bump([_cache_key(key) for key in keys])
+
+
+def invalidate_users(user_ids):
+    """Сбрасывает кэш токенов пользователей ``user_ids``.
+
+    Сигналы сбрасывают кэш при ``save`` и ``delete``; после массовых
+    изменений, например ``User.objects.update(is_active=False)``, эту
+    функцию нужно вызвать явно.
+    """
+    invalidate_tokens(
+        Token.objects.filter(user_id__in=user_ids).values_list(
+            'key', flat=True
+        )
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, кэширующая пользователя по токену.
+
+    Сначала проверяется кэш процесса (``TOKEN_CACHE_TIMEOUT`` секунд,
+    не больше ``TOKEN_CACHE_MAX_SIZE`` токенов), затем, при
+    ``TOKEN_CACHE_SHARED``, общий кэш Django. Запись помечена
+    поколением токена из ``api.generations`` и читается, только пока
+    поколение не сменилось. Поколение меняют сигналы из ``api.signals``
+    при удалении токена и сохранении пользователя, поэтому запрос,
+    прочитавший токен до выхода, не вернёт его в кэш. Поколения хранятся
+    в кэше Django: без общего кэша в других процессах запись живёт до
+    истечения ``TOKEN_CACHE_TIMEOUT``.
+    """
+
+    def authenticate_credentials(self, key):
+        """Возвращает пользователя и токен из кэша или из базы."""
+        cache_key = _cache_key(key)
+        generation = generations.get(cache_key)
+        data = local_cache.get(cache_key)
+        if (
+            (data is None or data[0] != generation)
+            and settings.TOKEN_CACHE_SHARED
+        ):
+            data = cache.get(cache_key)
+            if data is not None and data[0] == generation:
+                local_cache.set(cache_key, data)
+        if data is not None and data[0] == generation:
+            # Каждому запросу — своя копия пользователя.
+            return pickle.loads(data[1])
+        user, token = super().authenticate_credentials(key)
+        data = (generation, pickle.dumps((user, token)))
+        local_cache.set(cache_key, data)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.set(
+                cache_key, data, settings.TOKEN_CACHE_SHARED_TIMEOUT
+            )
+        return user, token
@@ -0,0 +1,313 @@
+"""Справочник тегов и ингредиентов в общем для воркеров файле.
+
+Идентификаторы, названия и единицы измерения ингредиентов,
+идентификаторы и slug тегов записываются массивами в файл
+``CATALOG_SEGMENT_PATH``: заголовок JSON с версиями данных и
+расположением массивов, затем сами массивы. Строки хранятся байтами
+UTF-8 подряд со смещениями границ, единицы измерения — один раз,
+ингредиенты ссылаются на них номером.
+
+Каждый процесс отображает файл в память (mmap) только для чтения,
+поэтому страницы справочника общие для всех воркеров и память на него
+не растёт с их числом. Название и единица ингредиента находятся
+двоичным поиском по массиву идентификаторов без ORM-объектов.
+
+Файл помечен версиями справочников из ``api.catalogs``, общими для
+всех процессов. Не чаще раза в ``CATALOG_SEGMENT_CHECK_SECONDS``
+процесс сверяет их и, если данные изменились, собирает файл заново:
+пишет временный файл и атомарно заменяет им старый. Если файл записать
+нельзя, справочник собирается в памяти процесса. До сверки теги,
+которых ещё нет в справочнике, ищутся в базе (``tag_ids``, ``tags``).
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from recipes.models import Ingredient, Tag
+
+from . import catalogs
+from .constants import CATALOG_SEGMENT_CHECK_SECONDS
+from .routers import PRIMARY
+
+MAGIC = b'FGCATSEG'
+
+_prefix = struct.Struct('<8sI')
+_lock = threading.Lock()
+_state = {'segment': None, 'checked': 0.0}
+
+
+def _aligned(size):
+    """Размер, округлённый вверх до 8 байт."""
+    return -(-size // 8) * 8
+
+
+def _position(ids, value):
+    """Номер ``value`` в отсортированном массиве ``ids`` или None."""
+    index = int(np.searchsorted(ids, value))
+    if index < len(ids) and ids[index] == value:
+        return index
+    return None
+
+
+class Segment:
+    """Справочник поверх буфера: отображённого файла или байтов."""
+
+    def __init__(self, buffer):
+        """Читает заголовок и создаёт массивы без копирования."""
+        magic, size = _prefix.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError('Файл не является справочником.')
+        header = json.loads(bytes(buffer[_prefix.size:_prefix.size + size]))
+        start = _aligned(_prefix.size + size)
+        self.versions = header['versions']
+        self.arrays = {
+            name: np.frombuffer(
+                buffer, dtype=dtype, count=count, offset=start + offset
+            )
+            for name, (dtype, offset, count) in header['arrays'].items()
+        }
+        self._units = [
+            self._string('unit', index)
+            for index in range(len(self.arrays['unit_offsets']) - 1)
+        ]
+        # Тегов единицы, поэтому поиск по slug держит словарь в процессе.
+        self._tag_ids = {
+            self._string('tag_slug', index): int(tag_id)
+            for index, tag_id in enumerate(self.arrays['tag_ids'])
+        }
+
+    def _string(self, name, index):
+        """Строка номер ``index`` из строковых массивов ``name``."""
+        offsets = self.arrays[f'{name}_offsets']
+        data = self.arrays[f'{name}_bytes']
+        return data[offsets[index]:offsets[index + 1]].tobytes().decode()
+
+    def ingredient(self, ingredient_id):
+        """Название и единица измерения ингредиента или None."""
+        index = _position(self.arrays['ingredient_ids'], ingredient_id)
+        if index is None:
+            return None
+        return (
+            self._string('ingredient_name', index),
+            self._units[self.arrays['ingredient_units'][index]],
+        )
+
+    def missing(self, ingredient_ids):
+        """Есть ли среди ``ingredient_ids`` отсутствующие в справочнике."""
+        return any(
+            _position(self.arrays['ingredient_ids'], ingredient_id) is None
+            for ingredient_id in ingredient_ids
+        )
+
+    def tag_slugs(self):
+        """Slug всех тегов."""
+        return list(self._tag_ids)
+
+    def tags(self):
+        """Пары slug и идентификатор всех тегов."""
+        return list(self._tag_ids.items())
+
+    def tag_ids(self, slugs):
+        """Идентификаторы тегов с известными slug из ``slugs``."""
+        return [self._tag_ids[slug] for slug in slugs if slug in self._tag_ids]
+
+    def unknown_tags(self, slugs):
+        """Slug из ``slugs``, которых нет в справочнике."""
+        return [slug for slug in slugs if slug not in self._tag_ids]
+
+
+def _strings(values):
+    """Смещения границ строк и их байты UTF-8 подряд."""
+    encoded = [value.encode() for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    offsets[1:] = np.cumsum([len(item) for item in encoded])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def _serialize(versions):
+    """Справочник версий ``versions`` из основной базы в виде байтов."""
+    ingredients = list(
+        Ingredient.objects.using(PRIMARY).order_by('id').values_list(
+            'id', 'name', 'measurement_unit'
+        )
+    )
+    tags = list(
+        Tag.objects.using(PRIMARY).order_by('id').values_list('id', 'slug')
+    )
+    units = sorted({unit for _, _, unit in ingredients})
+    unit_positions = {unit: position for position, unit in enumerate(units)}
+    arrays = {
+        'ingredient_ids': np.array(
+            [ingredient_id for ingredient_id, _, _ in ingredients],
+            dtype=np.int64,
+        ),
+        'ingredient_units': np.array(
+            [unit_positions[unit] for _, _, unit in ingredients],
+            dtype=np.uint32,
+        ),
+        'tag_ids': np.array(
+            [tag_id for tag_id, _ in tags], dtype=np.int64
+        ),
+    }
+    for name, values in (
+        ('ingredient_name', [name for _, name, _ in ingredients]),
+        ('unit', units),
+        ('tag_slug', [slug for _, slug in tags]),
+    ):
+        arrays[f'{name}_offsets'], arrays[f'{name}_bytes'] = _strings(values)
+    layout = {}
+    size = 0
+    for name, array in arrays.items():
+        layout[name] = (array.dtype.str, size, len(array))
+        size += _aligned(array.nbytes)
+    header = json.dumps({'versions': versions, 'arrays': layout}).encode()
+    start = _aligned(_prefix.size + len(header))
+    buffer = bytearray(start + size)
+    _prefix.pack_into(buffer, 0, MAGIC, len(header))
+    buffer[_prefix.size:_prefix.size + len(header)] = header
+    for name, array in arrays.items():
+        offset = start + layout[name][1]
+        buffer[offset:offset + array.nbytes] = array.tobytes()
+    return bytes(buffer)
+
+
+def tag_ids(slugs):
+    """Идентификаторы тегов по slug; новых для справочника — из базы."""
+    segment = current()
+    ids = segment.tag_ids(slugs)
+    unknown = segment.unknown_tags(slugs)
+    if unknown:
+        ids += Tag.objects.filter(slug__in=unknown).values_list(
+            'id', flat=True
+        )
+    return ids
+
+
+def tags(tag_ids=()):
+    """Пары slug и идентификатор всех тегов.
+
+    Теги из ``tag_ids``, которых ещё нет в справочнике, читаются из
+    базы.
+    """
+    pairs = current().tags()
+    unknown = set(tag_ids) - {tag_id for _, tag_id in pairs}
+    if unknown:
+        pairs += Tag.objects.filter(id__in=unknown).values_list('slug', 'id')
+    return pairs
+
+
+def _versions():
+    """Текущие версии справочников тегов и ингредиентов."""
+    return {
+        name: catalogs.version(name)
+        for name in (catalogs.TAGS, catalogs.INGREDIENTS)
+    }
+
+
+def _open(path):
+    """Справочник из файла ``path``, отображённого в память."""
+    with open(path, 'rb') as file:
+        return Segment(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def write(path=None):
+    """Собирает справочник из базы и атомарно заменяет им файл."""
+    path = path or settings.CATALOG_SEGMENT_PATH
+    content = _serialize(_versions())
+    _replace(path, content)
+    return len(content)
+
+
+def _replace(path, content):
+    """Записывает ``content`` во временный файл и заменяет им ``path``."""
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(temporary, 'wb') as file:
+            file.write(content)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def _attach(versions, force):
+    """Справочник версий ``versions``: из файла или собранный заново."""
+    path = settings.CATALOG_SEGMENT_PATH
+    if not force:
+        try:
+            segment = _open(path)
+        except (OSError, ValueError, KeyError, struct.error):
+            segment = None
+        if segment is not None and segment.versions == versions:
+            return segment
+    content = _serialize(versions)
+    try:
+        _replace(path, content)
+        return _open(path)
+    except OSError:
+        return Segment(content)
+
+
+def refresh(force=False):
+    """Сверяет справочник процесса с версиями данных.
+
+    ``force`` собирает файл заново, даже если версии совпадают.
+    """
+    with _lock:
+        versions = _versions()
+        segment = _state['segment']
+        if force or segment is None or segment.versions != versions:
+            segment = _attach(versions, force)
+        _state['segment'] = segment
+        _state['checked'] = time.monotonic()
+        return segment
+
+
+def _in_event_loop():
+    """Выполняется ли код в цикле событий."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _due():
+    """Пора ли сверить справочник с версиями данных."""
+    return (
+        time.monotonic() - _state['checked'] >= CATALOG_SEGMENT_CHECK_SECONDS
+    )
+
+
+def current():
+    """Справочник процесса, сверенный с данными недавно.
+
+    В цикле событий справочник не обновляется: асинхронные
+    представления готовят его заранее через ``aprepare``.
+    """
+    segment = _state['segment']
+    if segment is not None and (not _due() or _in_event_loop()):
+        return segment
+    return refresh()
+
+
+async def aprepare(ingredient_ids=()):
+    """Готовит справочник к сериализации в цикле событий.
+
+    Справочник обновляется, если пора сверить версии или в нём нет
+    какого-то из ``ingredient_ids``.
+    """
+    segment = _state['segment']
+    missing = segment is not None and segment.missing(ingredient_ids)
+    if segment is None or missing or _due():
+        segment = await sync_to_async(refresh)(force=missing)
+    return segment
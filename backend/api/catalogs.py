@@ -0,0 +1,185 @@
+"""Готовые ответы со справочниками тегов и ингредиентов.
+
+Полные списки тегов и ингредиентов меняются редко, поэтому ответ без
+фильтров собирается один раз на версию данных: тело кодируется
+рендерером API, сжимается кодировками из
+``RESPONSE_COMPRESSION_ENCODINGS`` и кладётся в кэш вместе с ETag.
+Версия — случайная метка в ``CatalogVersion``, которую сигналы
+сохранения и удаления Tag и Ingredient меняют в той же транзакции,
+поэтому её видят все воркеры. Процесс перечитывает метку не чаще раза
+в ``CATALOG_VERSION_CHECK_SECONDS`` и хранит последнюю собранную
+версию в памяти, поэтому ответ обычно отдаётся без обращений к базе и
+сериализаторам.
+"""
+
+import hashlib
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.settings import api_settings
+
+from recipes.models import CatalogVersion
+
+from . import compression
+from .constants import CATALOG_CACHE_TIMEOUT, CATALOG_VERSION_CHECK_SECONDS
+from .routers import PRIMARY
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+
+_built = {}
+_versions = {}
+
+
+class Catalog:
+    """Собранный ответ: тело, его сжатые варианты и ETag."""
+
+    def __init__(self, body, variants, etag):
+        """Создаёт ответ из готовых байтов."""
+        self.body = body
+        self.variants = variants
+        self.etag = etag
+
+    def to_value(self):
+        """Значение для кэша."""
+        return self.body, self.variants, self.etag
+
+    def response(self, request):
+        """Ответ API с вариантом тела, подходящим клиенту."""
+        encoding = compression.negotiate(
+            request.headers.get('Accept-Encoding', ''), list(self.variants)
+        )
+        etag = self.etag if encoding is None else (
+            f'{self.etag[:-1]}-{encoding}"'
+        )
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (
+            etag in parse_etags(if_none_match) or if_none_match == '*'
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                self.body if encoding is None else self.variants[encoding],
+                content_type=_content_type(),
+            )
+            if encoding is not None:
+                response.headers['Content-Encoding'] = encoding
+        response.headers['ETag'] = etag
+        response.headers['Vary'] = 'Accept'
+        if self.variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def _content_type():
+    """Тип содержимого ответа рендерера API."""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]
+    if renderer.charset:
+        return f'{renderer.media_type}; charset={renderer.charset}'
+    return renderer.media_type
+
+
+def _build(queryset, serializer_class):
+    """Кодирует и сжимает справочник."""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    body = renderer.render(serializer_class(queryset, many=True).data)
+    variants = {}
+    if (
+        settings.RESPONSE_COMPRESSION
+        and len(body) >= settings.RESPONSE_COMPRESSION_MIN_SIZE
+    ):
+        for encoding in compression.available_encodings(
+            settings.RESPONSE_COMPRESSION_ENCODINGS
+        ):
+            content = compression.compress(encoding, body)
+            if len(content) < len(body):
+                variants[encoding] = content
+    etag = '"{}"'.format(hashlib.blake2b(body, digest_size=16).hexdigest())
+    return Catalog(body, variants, etag)
+
+
+def _catalog_key(name, version):
+    """Ключ кэша собранного справочника."""
+    return f'catalog:{name}:{version}'
+
+
+def _load(name, version, queryset, serializer_class):
+    """Справочник версии ``version`` из кэша или собранный заново.
+
+    Справочник собирается по основной базе: под новой версией не должны
+    оказаться данные отстающей реплики.
+    """
+    value = cache.get(_catalog_key(name, version))
+    if value is None:
+        catalog = _build(queryset.using(PRIMARY), serializer_class)
+        cache.set(
+            _catalog_key(name, version), catalog.to_value(),
+            CATALOG_CACHE_TIMEOUT,
+        )
+    else:
+        catalog = Catalog(*value)
+    _built[name] = (version, catalog)
+    return catalog
+
+
+def _checked_version(name):
+    """Метка версии, прочитанная недавно, или None."""
+    checked, current = _versions.get(name, (None, None))
+    if (
+        checked is not None
+        and time.monotonic() - checked < CATALOG_VERSION_CHECK_SECONDS
+    ):
+        return current
+    return None
+
+
+def version(name):
+    """Метка текущей версии справочника ``name``."""
+    current = _checked_version(name)
+    if current is None:
+        current = CatalogVersion.objects.using(PRIMARY).get_or_create(
+            name=name, defaults={'version': uuid.uuid4().hex}
+        )[0].version
+        _versions[name] = (time.monotonic(), current)
+    return current
+
+
+def get(name, queryset, serializer_class):
+    """Справочник ``name`` текущей версии.
+
+    ``queryset`` и ``serializer_class`` нужны, только если справочник
+    этой версии ещё не собран.
+    """
+    current_version = version(name)
+    built_version, catalog = _built.get(name, (None, None))
+    if built_version == current_version:
+        return catalog
+    return _load(name, current_version, queryset, serializer_class)
+
+
+async def aget(name, queryset, serializer_class):
+    """Асинхронный вариант ``get``."""
+    current_version = _checked_version(name)
+    built_version, catalog = _built.get(name, (None, None))
+    if current_version is not None and built_version == current_version:
+        return catalog
+    return await sync_to_async(get)(name, queryset, serializer_class)
+
+
+def invalidate(name):
+    """Меняет версию справочника в текущей транзакции.
+
+    После коммита процесс перечитывает версию сразу, остальные — при
+    очередной проверке.
+    """
+    CatalogVersion.objects.update_or_create(
+        name=name, defaults={'version': uuid.uuid4().hex}
+    )
+    transaction.on_commit(lambda: _versions.pop(name, None))
@@ -0,0 +1,169 @@
+"""Сжатие ответов: выбор кодировки по Accept-Encoding и компрессоры.
+
+gzip доступен всегда; br и zstd — при установленных пакетах
+``brotli`` и ``zstandard``. Уровни сжатия выбраны для динамических
+ответов: сжатие не должно стоить дороже, чем экономия на передаче.
+"""
+
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+# Выталкивание обрывает окно сжатия, поэтому в потоке оно выполняется
+# не после каждой части, а после стольких байт исходных данных.
+STREAM_FLUSH_SIZE = 64 * 1024
+
+
+class GzipCompressor:
+    """Потоковый компрессор gzip."""
+
+    def __init__(self):
+        """Создаёт компрессор."""
+        self._compressor = zlib.compressobj(
+            GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def compress(self, data):
+        """Сжимает очередную часть; вывод может задерживаться."""
+        return self._compressor.compress(data)
+
+    def flush(self):
+        """Выталкивает всё сжатое к этому моменту."""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        """Завершает поток."""
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    """Потоковый компрессор brotli."""
+
+    def __init__(self):
+        """Создаёт компрессор."""
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        """Сжимает очередную часть; вывод может задерживаться."""
+        return self._compressor.process(data)
+
+    def flush(self):
+        """Выталкивает всё сжатое к этому моменту."""
+        return self._compressor.flush()
+
+    def finish(self):
+        """Завершает поток."""
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    """Потоковый компрессор zstd."""
+
+    def __init__(self):
+        """Создаёт компрессор."""
+        self._compressor = zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL
+        ).compressobj()
+
+    def compress(self, data):
+        """Сжимает очередную часть; вывод может задерживаться."""
+        return self._compressor.compress(data)
+
+    def flush(self):
+        """Выталкивает всё сжатое к этому моменту."""
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        """Завершает поток."""
+        return self._compressor.flush()
+
+
+COMPRESSORS = {'gzip': GzipCompressor}
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS['zstd'] = ZstdCompressor
+
+
+def available_encodings(preferred):
+    """Кодировки из ``preferred``, для которых есть компрессор."""
+    return [encoding for encoding in preferred if encoding in COMPRESSORS]
+
+
+def negotiate(accept_encoding, encodings):
+    """Кодировка из ``encodings`` для заголовка ``accept_encoding``.
+
+    Выбирается кодировка с наибольшим q; при равных q — ранняя в
+    ``encodings``. Возвращает None, если клиент не принимает ни одну.
+    """
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, *params = item.strip().lower().split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            weights[coding.strip()] = quality
+    best = None
+    for position, encoding in enumerate(encodings):
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[0]):
+            best = (quality, position, encoding)
+    return best and best[2]
+
+
+def compress(encoding, data):
+    """Сжимает ``data`` целиком."""
+    compressor = COMPRESSORS[encoding]()
+    return compressor.compress(data) + compressor.finish()
+
+
+def _feed(compressor, chunk, pending):
+    """Сжимает часть потока и выталкивает сжатое, если накопилось.
+
+    ``pending`` — байты, поданные после последнего выталкивания.
+    """
+    data = compressor.compress(chunk)
+    pending += len(chunk)
+    if pending >= STREAM_FLUSH_SIZE:
+        data += compressor.flush()
+        pending = 0
+    return data, pending
+
+
+def compress_stream(encoding, chunks):
+    """Сжимает поток, выталкивая сжатое по ``STREAM_FLUSH_SIZE`` байт."""
+    compressor = COMPRESSORS[encoding]()
+    pending = 0
+    for chunk in chunks:
+        data, pending = _feed(compressor, chunk, pending)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_stream(encoding, chunks):
+    """Асинхронный вариант ``compress_stream``."""
+    compressor = COMPRESSORS[encoding]()
+    pending = 0
+    async for chunk in chunks:
+        data, pending = _feed(compressor, chunk, pending)
+        if data:
+            yield data
+    yield compressor.finish()
@@ -13,3 +13,32 @@ MAX_COOKING_TIME = 600
 MAX_INGREDIENT_AMOUNT = 5000
 MIN_COOKING_TIME = 1
 MIN_INGREDIENT_AMOUNT = 1
+ID_SETS_CACHE_TIMEOUT = 60
+FEED_MAX_LENGTH = 500
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+FEED_FANOUT_RESUME_FOLLOWERS = 800
+FEED_POPULAR_AUTHORS_CACHE_TIMEOUT = 10 * 60
+MAX_FEED_PAGE_SIZE = 100
+TRENDING_HALF_LIFE_DAYS = 7
+TRENDING_WINDOW_DAYS = 28
+TRENDING_FAVORITE_WEIGHT = 2
+TRENDING_SHOPPING_CART_WEIGHT = 1
+SIMILAR_RECIPES_COUNT = 10
+SIMILAR_RECIPES_TAG_WEIGHT = 0.5
+SIMILAR_RECIPES_MAX_INGREDIENT_SHARE = 0.05
+SIMILAR_RECIPES_MIN_RARE_COUNT = 100
+INGREDIENT_INDEX_CACHE_TIMEOUT = 5 * 60
+COOK_QUERY_MAX_INGREDIENTS = 50
+RECIPE_COMPACT_FIELDS = ('id', 'name', 'image', 'cooking_time', 'tags')
+RECIPE_BATCH_MAX_SIZE = 100
+SYNC_PAGE_SIZE = 100
+MAX_SYNC_PAGE_SIZE = 500
+SYNC_COMMIT_LAG_SECONDS = 10
+SYNC_TOMBSTONE_RETENTION_DAYS = 90
+CATALOG_CACHE_TIMEOUT = 24 * 60 * 60
+CATALOG_VERSION_CHECK_SECONDS = 5
+CATALOG_SEGMENT_CHECK_SECONDS = 5
+ESTIMATED_COUNT_THRESHOLD = 100000
+EXPORT_CHUNK_SIZE = 2000
+ESTIMATED_COUNT_CACHE_TIMEOUT = 60
+FACETS_CACHE_TIMEOUT = 60
@@ -0,0 +1,102 @@
+"""Число рецептов с каждым тегом при текущих фильтрах списка.
+
+С параметром ``facets=1`` ответ списка рецептов содержит ``facets``:
+в ``facets.tags`` для каждого slug тега — число рецептов с этим тегом
+среди подходящих под остальные фильтры (автор, избранное, корзина,
+время, ингредиенты). Собственный фильтр ``tags`` не учитывается:
+число показывает, сколько рецептов даст выбор тега. Числа считает один
+запрос с группировкой по таблице связи рецептов и тегов. Если числа
+не зависят от пользователя (нет фильтров по избранному и корзине или
+запрос анонимный), результат кэшируется на ``FACETS_CACHE_TIMEOUT``
+секунд для каждого набора фильтров.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from recipes.estimates import is_unfiltered
+from recipes.models import Recipe
+
+from . import catalog_segment
+from .constants import FACETS_CACHE_TIMEOUT
+from .fieldsets import TRUE_VALUES
+from .filters import RecipeFilter
+
+# Параметры списка, которые не меняют набор рецептов для счётчиков.
+IGNORED_PARAMS = frozenset((
+    'tags', 'page', 'limit', 'fields', 'omit', 'compact', 'normalized',
+    'facets',
+))
+
+# Фильтры, результат которых зависит от пользователя.
+USER_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def is_requested(request):
+    """Запрошены ли счётчики тегов."""
+    return request.query_params.get('facets', '').lower() in TRUE_VALUES
+
+
+def _filter_params(request):
+    """Параметры фильтров, влияющие на счётчики."""
+    params = request.query_params.copy()
+    for param in IGNORED_PARAMS:
+        params.pop(param, None)
+    return params
+
+
+def _cache_key(params):
+    """Ключ кэша счётчиков для набора фильтров."""
+    digest = hashlib.blake2b(
+        '&'.join(sorted(
+            f'{name}={value}'
+            for name, values in params.lists()
+            for value in values
+        )).encode(),
+        digest_size=16,
+    ).hexdigest()
+    return f'recipe-facets:{digest}'
+
+
+def tag_counts_queryset(request, params):
+    """Запрос пар тег — число рецептов среди отфильтрованных ``params``."""
+    recipes = RecipeFilter(
+        params, queryset=Recipe.objects.all(), request=request
+    ).qs
+    rows = Recipe.tags.through.objects.all()
+    if not is_unfiltered(recipes):
+        rows = rows.filter(recipe_id__in=recipes.order_by().values('pk'))
+    return (
+        rows.order_by().values('tag_id')
+        .annotate(count=Count('recipe_id'))
+        .values_list('tag_id', 'count')
+    )
+
+
+def _tag_counts(request, params):
+    """Число рецептов с каждым тегом среди отфильтрованных."""
+    counts = dict(tag_counts_queryset(request, params))
+    return {
+        slug: counts.get(tag_id, 0)
+        for slug, tag_id in catalog_segment.tags(counts)
+    }
+
+
+def recipe_facets(request):
+    """Счётчики для ответа списка рецептов."""
+    params = _filter_params(request)
+    if request.user.is_authenticated and any(
+        params.get(param) for param in USER_PARAMS
+    ):
+        return {'tags': _tag_counts(request, params)}
+    # Для анонимных и пустых значений эти фильтры ничего не меняют.
+    for param in USER_PARAMS:
+        params.pop(param, None)
+    key = _cache_key(params)
+    data = cache.get(key)
+    if data is None:
+        data = {'tags': _tag_counts(request, params)}
+        cache.set(key, data, FACETS_CACHE_TIMEOUT)
+    return data
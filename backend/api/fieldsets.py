@@ -0,0 +1,77 @@
+"""Выборочные поля рецептов в ответах API.
+
+Параметр ``fields`` перечисляет через запятую поля ``RecipeSerializer``,
+которые нужно вернуть, ``omit`` — поля, которые нужно убрать, а
+``compact=1`` выбирает поля карточки рецепта ``RECIPE_COMPACT_FIELDS``.
+Выбранные поля сужают и запрос: ненужные столбцы не загружаются,
+а связи автора, тегов и ингредиентов подгружаются только для
+запрошенных полей.
+"""
+
+from rest_framework.exceptions import ValidationError
+
+from .constants import RECIPE_COMPACT_FIELDS
+
+TRUE_VALUES = ('1', 'true')
+
+# Столбцы Recipe, без которых не обойтись полю сериализатора.
+COLUMNS = {
+    'name': ('name',),
+    'text': ('text',),
+    'cooking_time': ('cooking_time',),
+    'author': ('author',),
+    'image': ('image',),
+}
+
+# Связи, которые поле сериализатора читает у каждого рецепта.
+RELATIONS = {
+    'tags': 'tags',
+    # Названия и единицы ингредиентов берутся из api.catalog_segment.
+    'ingredients': 'recipe_ingredients',
+}
+
+
+def _names(request, param, available):
+    """Имена полей из параметра ``param``; неизвестные — ошибка 400."""
+    names = [
+        name.strip()
+        for value in request.query_params.getlist(param)
+        for name in value.split(',')
+        if name.strip()
+    ]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValidationError(
+            {param: [f'Неизвестное поле: {name}.' for name in unknown]}
+        )
+    return names
+
+
+def recipe_fields(request, available):
+    """Поля рецепта, запрошенные клиентом; None — все ``available``."""
+    fields = _names(request, 'fields', available)
+    omit = set(_names(request, 'omit', available))
+    if not fields and (
+        request.query_params.get('compact', '').lower() in TRUE_VALUES
+    ):
+        fields = RECIPE_COMPACT_FIELDS
+    if not fields and not omit:
+        return None
+    return frozenset(fields or available) - omit
+
+
+def recipe_queryset(queryset, fields=None):
+    """Queryset рецептов только со связями и столбцами для ``fields``."""
+    if fields is None or 'author' in fields:
+        queryset = queryset.select_related('author')
+    queryset = queryset.prefetch_related(*(
+        relation for name, relation in RELATIONS.items()
+        if fields is None or name in fields
+    ))
+    if fields is None:
+        return queryset
+    return queryset.only('id', *(
+        column
+        for name in fields
+        for column in COLUMNS.get(name, ())
+    ))
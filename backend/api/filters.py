@@ -1,25 +1,77 @@
 """Фильтры для API."""
 
 import django_filters
+from django.db.models import Exists, OuterRef
+from django_filters.fields import MultipleChoiceField
 from django_filters.rest_framework import FilterSet
 
-from recipes.models import Ingredient, Recipe
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+from . import catalog_segment
+
+
+class TagSlugField(MultipleChoiceField):
+    """Slug тегов: по справочнику, а ещё не попавшие в него — по базе."""
+
+    def valid_value(self, value):
+        """Проверяет slug по справочнику или по таблице тегов."""
+        return (
+            super().valid_value(value)
+            or Tag.objects.filter(slug=value).exists()
+        )
+
+
+class TagSlugFilter(django_filters.MultipleChoiceFilter):
+    """Фильтр по slug тегов из api.catalog_segment."""
+
+    field_class = TagSlugField
 
 
 class RecipeFilter(FilterSet):
-    """Фильтр для рецептов с поддержкой избранного и корзины покупок."""
+    """Фильтр для рецептов с поддержкой избранного и корзины покупок.
+
+    Теги и ингредиенты проверяются подзапросами ``EXISTS``: они не
+    размножают строки рецептов и не требуют ``DISTINCT``, поэтому
+    комбинируются с сортировкой по индексу ``published_at``. Slug тегов
+    проверяются и переводятся в идентификаторы по api.catalog_segment,
+    к таблице тегов обращаются только за тегами, которых ещё нет в
+    справочнике процесса.
+    """
 
     is_favorited = django_filters.CharFilter(method='filter_is_favorited')
     is_in_shopping_cart = django_filters.CharFilter(
         method='filter_is_in_shopping_cart'
     )
-    tags = django_filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = TagSlugFilter(
+        choices=lambda: [
+            (slug, slug) for slug in catalog_segment.current().tag_slugs()
+        ],
+        method='filter_tags',
+    )
+    cooking_time = django_filters.RangeFilter()
+    published_at = django_filters.IsoDateTimeFromToRangeFilter()
+    ingredients = django_filters.ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(), method='filter_ingredients'
+    )
+    exclude_ingredients = django_filters.ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='filter_exclude_ingredients'
+    )
 
     class Meta:
         """Метаданные фильтрации для модели Recipe."""
 
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author',
+            'tags',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'cooking_time',
+            'published_at',
+            'ingredients',
+            'exclude_ingredients',
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         """Фильтрация рецептов, добавленных в избранное."""
@@ -35,6 +87,37 @@ class RecipeFilter(FilterSet):
             return queryset.filter(in_shopping_cart__user=user)
         return queryset
 
+    def filter_tags(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тегов."""
+        if not value:
+            return queryset
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'),
+                tag_id__in=catalog_segment.tag_ids(value),
+            )
+        ))
+
+    def filter_ingredients(self, queryset, name, value):
+        """Рецепты со всеми указанными ингредиентами."""
+        for ingredient in value:
+            queryset = queryset.filter(Exists(
+                RecipeIngredient.objects.filter(
+                    recipe_id=OuterRef('pk'), ingredient=ingredient
+                )
+            ))
+        return queryset
+
+    def filter_exclude_ingredients(self, queryset, name, value):
+        """Рецепты без указанных ингредиентов."""
+        if not value:
+            return queryset
+        return queryset.exclude(Exists(
+            RecipeIngredient.objects.filter(
+                recipe_id=OuterRef('pk'), ingredient__in=value
+            )
+        ))
+
 
 class IngredientSearchFilter(django_filters.FilterSet):
     """Фильтр для ингредиентов по названию."""
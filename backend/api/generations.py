@@ -0,0 +1,78 @@
+"""Поколения записей кэша Django.
+
+Ключ кэшированной записи содержит номер поколения её данных: токена,
+пользователя, ингредиента. Сброс после фиксации транзакции увеличивает
+номер, и записи прежнего поколения больше не читаются, их вытесняет
+TTL. Номер читается до обращения к базе, поэтому запись, собранная по
+данным до изменения, но сохранённая после сброса, ложится под старый
+номер и не возвращает устаревшие данные в кэш.
+
+Номер, которого нет в кэше, например вытесненный, начинается со
+случайного значения, чтобы не совпасть с номером ещё живых записей.
+"""
+
+import secrets
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _key(name):
+    """Ключ номера поколения."""
+    return f'generation:{name}'
+
+
+def _initial():
+    """Случайный начальный номер поколения."""
+    return secrets.randbits(48)
+
+
+def get_many(names):
+    """Номера поколений ``names``: словарь имя — номер."""
+    keys = {_key(name): name for name in names}
+    generations = {
+        keys[key]: generation
+        for key, generation in cache.get_many(keys).items()
+    }
+    missing = {
+        _key(name): _initial() for name in names if name not in generations
+    }
+    if missing:
+        for key, generation in missing.items():
+            cache.add(key, generation, None)
+        # Номер мог добавить другой процесс раньше этого.
+        stored = cache.get_many(list(missing))
+        for key, generation in missing.items():
+            generations[keys[key]] = stored.get(key, generation)
+    return generations
+
+
+def get(name):
+    """Номер поколения ``name``."""
+    return get_many([name])[name]
+
+
+async def aget(name):
+    """Асинхронный вариант ``get``."""
+    key = _key(name)
+    generation = await cache.aget(key)
+    if generation is None:
+        initial = _initial()
+        await cache.aadd(key, initial, None)
+        generation = await cache.aget(key, initial)
+    return generation
+
+
+def _bump(names):
+    """Увеличивает номера поколений ``names``."""
+    for name in names:
+        try:
+            cache.incr(_key(name))
+        except ValueError:
+            cache.set(_key(name), _initial(), None)
+
+
+def bump(names):
+    """Увеличивает номера поколений после фиксации транзакции."""
+    names = list(names)
+    transaction.on_commit(lambda: _bump(names))
@@ -0,0 +1,156 @@
+"""Кэш идентификаторов избранного, корзины и подписок пользователя.
+
+Для каждого пользователя и вида связи в кэше хранится отсортированный
+массив идентификаторов (``array('q')`` в байтах, 8 байт на элемент).
+Массив строится при первом обращении и живёт ``ID_SETS_CACHE_TIMEOUT``
+секунд. Ключ массива содержит поколение набора из ``api.generations``:
+любое изменение связей, в том числе из админки и каскадным удалением,
+меняет поколение после фиксации транзакции, поэтому массив, прочитанный
+из базы до изменения, не вернётся в кэш под новым ключом. В пределах
+запроса прочитанные массивы запоминаются, поэтому флаги целой страницы
+вычисляются без обращений к базе и к кэшу.
+
+Локальный кэш процесса не видит смены поколений в других воркерах, поэтому
+без общего кэша наборы читаются из базы в каждом запросе.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Favorite, ShoppingCart, Subscription
+
+from . import generations
+from .constants import ID_SETS_CACHE_TIMEOUT
+from .routers import PRIMARY
+
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+SUBSCRIPTIONS = 'subscriptions'
+
+SOURCES = {
+    FAVORITES: (Favorite, 'recipe_id'),
+    SHOPPING_CART: (ShoppingCart, 'recipe_id'),
+    SUBSCRIPTIONS: (Subscription, 'subscribed_user_id'),
+}
+
+
+class IdSet:
+    """Отсортированный массив идентификаторов с поиском делением пополам."""
+
+    def __init__(self, ids):
+        """Создаёт набор из отсортированного ``array('q')``."""
+        self.ids = ids
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Восстанавливает набор из значения в кэше."""
+        ids = array('q')
+        ids.frombytes(data)
+        return cls(ids)
+
+    def __contains__(self, value):
+        """Проверяет наличие идентификатора."""
+        index = bisect_left(self.ids, value)
+        return index < len(self.ids) and self.ids[index] == value
+
+    def __len__(self):
+        """Число идентификаторов."""
+        return len(self.ids)
+
+    def to_bytes(self):
+        """Значение для кэша."""
+        return self.ids.tobytes()
+
+
+def _name(kind, user_id):
+    """Имя набора идентификаторов."""
+    return f'id-set:{kind}:{user_id}'
+
+
+def _cache_key(kind, user_id, generation):
+    """Ключ кэша набора идентификаторов поколения ``generation``."""
+    return f'{_name(kind, user_id)}:{generation}'
+
+
+def _queryset(kind, user_id):
+    """Отсортированные идентификаторы из основной базы.
+
+    Набор попадает в кэш, поэтому не читается с отстающей реплики.
+    """
+    model, field = SOURCES[kind]
+    return model.objects.using(PRIMARY).filter(user_id=user_id).order_by(
+        field
+    ).values_list(field, flat=True)
+
+
+def _memo(request):
+    """Наборы, уже прочитанные в этом запросе."""
+    if not hasattr(request, '_id_sets'):
+        request._id_sets = {}
+    return request._id_sets
+
+
+def _load(kind, user_id):
+    """Набор из кэша или из базы с сохранением в кэш."""
+    if not settings.SHARED_CACHE:
+        return IdSet(array('q', _queryset(kind, user_id)))
+    key = _cache_key(
+        kind, user_id, generations.get(_name(kind, user_id))
+    )
+    data = cache.get(key)
+    if data is not None:
+        return IdSet.from_bytes(data)
+    id_set = IdSet(array('q', _queryset(kind, user_id)))
+    cache.set(key, id_set.to_bytes(), ID_SETS_CACHE_TIMEOUT)
+    return id_set
+
+
+async def _aload(kind, user_id):
+    """Асинхронный вариант ``_load``."""
+    if settings.SHARED_CACHE:
+        key = _cache_key(
+            kind, user_id, await generations.aget(_name(kind, user_id))
+        )
+        data = await cache.aget(key)
+        if data is not None:
+            return IdSet.from_bytes(data)
+    id_set = IdSet(array('q', [
+        value async for value in _queryset(kind, user_id)
+    ]))
+    if settings.SHARED_CACHE:
+        await cache.aset(key, id_set.to_bytes(), ID_SETS_CACHE_TIMEOUT)
+    return id_set
+
+
+def get_id_set(request, kind):
+    """Набор идентификаторов вида ``kind`` для пользователя запроса.
+
+    Для анонимного пользователя возвращается пустой набор.
+    """
+    memo = _memo(request)
+    if kind not in memo:
+        user = request.user
+        memo[kind] = (
+            _load(kind, user.id) if user.is_authenticated
+            else IdSet(array('q'))
+        )
+    return memo[kind]
+
+
+async def aload_id_sets(request):
+    """Загружает все наборы пользователя запроса из асинхронного кода."""
+    memo = _memo(request)
+    user = request.user
+    for kind in SOURCES:
+        if kind not in memo:
+            memo[kind] = (
+                await _aload(kind, user.id) if user.is_authenticated
+                else IdSet(array('q'))
+            )
+
+
+def invalidate(kind, user_id):
+    """Меняет поколение набора пользователя после фиксации транзакции."""
+    generations.bump([_name(kind, user_id)])
@@ -0,0 +1,134 @@
+"""Инструментирование запросов: тайминги этапов и журнал SQL-запросов.
+
+Сбор включается middleware ``ServerTimingMiddleware``. Пока он не
+активен для текущего запроса, ``timed`` ничего не измеряет.
+"""
+
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+_current = ContextVar('request_timings', default=None)
+
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_SKIPPED_FILES = ('instrumentation.py', 'middleware.py')
+
+
+class RequestTimings:
+    """Тайминги этапов и SQL-запросы одного HTTP-запроса."""
+
+    def __init__(self):
+        """Создаёт пустой набор измерений."""
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.queries = []
+        self._depth = defaultdict(int)
+
+    def add(self, name, duration):
+        """Добавляет длительность этапа в секундах."""
+        self.durations[name] += duration
+
+    def duplicates(self):
+        """Возвращает повторяющиеся запросы, сгруппированные по отпечатку."""
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[query['fingerprint']].append(query)
+        return {
+            fingerprint: items
+            for fingerprint, items in groups.items()
+            if len(items) > 1
+        }
+
+
+def fingerprint(sql):
+    """Нормализует SQL: списки параметров IN сворачиваются в один."""
+    return _IN_LIST_RE.sub('IN (...)', sql)
+
+
+def _call_site():
+    """Определяет, откуда выполнен запрос.
+
+    Возвращает поле сериализатора, которое сейчас сериализуется, и
+    ближайший кадр кода проекта вне ``to_representation``.
+    """
+    base_dir = str(Path(settings.BASE_DIR))
+    field_label = site = None
+    frame = sys._getframe(2)
+    while frame is not None and not (field_label and site):
+        code = frame.f_code
+        if code.co_name == 'to_representation':
+            field = frame.f_locals.get('field')
+            if field_label is None and hasattr(field, 'field_name'):
+                field_label = (
+                    f'{type(frame.f_locals["self"]).__name__}.'
+                    f'{field.field_name}'
+                )
+        elif site is None and code.co_filename.startswith(base_dir):
+            if not code.co_filename.endswith(_SKIPPED_FILES):
+                site = (
+                    f'{Path(code.co_filename).relative_to(base_dir)}:'
+                    f'{frame.f_lineno} {code.co_name}'
+                )
+        frame = frame.f_back
+    return ' @ '.join(filter(None, (field_label, site))) or None
+
+
+def current():
+    """Возвращает измерения текущего запроса или None."""
+    return _current.get()
+
+
+def start():
+    """Начинает сбор измерений для текущего контекста."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop(token):
+    """Завершает сбор измерений для текущего контекста."""
+    _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """Измеряет блок кода как этап ``name``.
+
+    Вложенные блоки с тем же именем учитываются один раз.
+    """
+    timings = _current.get()
+    if timings is None or timings._depth[name]:
+        yield
+        return
+    timings._depth[name] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._depth[name] -= 1
+        timings.add(name, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка ``execute_wrapper``, записывающая каждый SQL-запрос."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        timings.add('db', duration)
+        timings.queries.append({
+            'sql': sql,
+            'fingerprint': fingerprint(sql),
+            'duration': duration,
+            'alias': context['connection'].alias,
+            'call_site': _call_site(),
+        })
@@ -0,0 +1,83 @@
+"""Замер кодирования JSON и сжатия ответов эндпоинтов."""
+
+import json
+import statistics
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api import compression
+from api.management.commands.benchmark_endpoints import _environ
+from api.renderers import FastJSONRenderer, orjson
+
+
+def _median_ms(function, repeat):
+    """Медианное время вызова ``function`` в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+class Command(BaseCommand):
+    """Сравнивает рендереры JSON и кодировки сжатия на ответах API.
+
+    Для каждого эндпоинта ответ запрашивается без сжатия, разбирается и
+    кодируется заново стандартным JSONRenderer и FastJSONRenderer; затем
+    тело сжимается каждой доступной кодировкой. Выводятся размер тела и
+    медианное время каждой операции.
+    """
+
+    help = 'Замеряет кодирование JSON и сжатие ответов эндпоинтов.'
+
+    def add_arguments(self, parser):
+        """Параметры замера."""
+        parser.add_argument('urls', nargs='+', metavar='URL')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--header', action='append', default=[],
+            help='Заголовок запроса вида "Name: value".',
+        )
+
+    def handle(self, *args, **options):
+        """Выводит строку с замерами для каждого эндпоинта."""
+        handler = WSGIHandler()
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(status)
+
+        for url in options['urls']:
+            headers = options['header'] + ['Accept-Encoding: identity']
+            response = handler(_environ(url, headers), start_response)
+            content = b''.join(response)
+            response.close()
+            if int(statuses[-1].split()[0]) >= 400:
+                raise CommandError(f'{url}: {statuses[-1]}')
+            data = json.loads(content)
+            repeat = options['repeat']
+            columns = [
+                f'{url:<40}{len(content):>9} B',
+                'json {:7.2f} ms'.format(
+                    _median_ms(lambda: JSONRenderer().render(data), repeat)
+                ),
+            ]
+            if orjson is not None:
+                columns.append('orjson {:7.2f} ms'.format(_median_ms(
+                    lambda: FastJSONRenderer().render(data), repeat
+                )))
+            for encoding in compression.COMPRESSORS:
+                compressed = compression.compress(encoding, content)
+                columns.append('{} {:>8} B {:6.2f} ms'.format(
+                    encoding,
+                    len(compressed),
+                    _median_ms(
+                        lambda: compression.compress(encoding, content),
+                        repeat,
+                    ),
+                ))
+            self.stdout.write('  '.join(columns))
@@ -0,0 +1,182 @@
+"""Замер задержки эндпоинтов через WSGI-обработчик Django."""
+
+import http.client
+import io
+import itertools
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+
+
+def _environ(url, headers):
+    """WSGI-окружение GET-запроса к ``url``."""
+    parts = urlsplit(url)
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for header in headers:
+        name, _, value = header.partition(':')
+        environ['HTTP_' + name.strip().upper().replace('-', '_')] = (
+            value.strip()
+        )
+    return environ
+
+
+def _percentile(timings, fraction):
+    """Перцентиль отсортированного списка замеров."""
+    return timings[max(0, int(len(timings) * fraction) - 1)]
+
+
+class Command(BaseCommand):
+    """Выполняет GET-запросы к эндпоинтам так, как это делает gunicorn.
+
+    В отличие от тестового клиента, запросы идут через ``WSGIHandler``
+    вместе с сигналами ``request_started``/``request_finished``, поэтому
+    соединения с БД открываются и закрываются по настройкам
+    ``CONN_MAX_AGE`` и пула, как в воркере.
+
+    С ``--server`` запросы отправляются по HTTP запущенному серверу
+    (gunicorn с синхронными воркерами или uvicorn) из ``--concurrency``
+    параллельных клиентов, и выводится пропускная способность.
+    """
+
+    help = 'Замеряет задержку GET-запросов к эндпоинтам API.'
+
+    def add_arguments(self, parser):
+        """Параметры замера."""
+        parser.add_argument('urls', nargs='+', metavar='URL')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--header', action='append', default=[],
+            help='Заголовок запроса вида "Name: value".',
+        )
+        parser.add_argument(
+            '--server', metavar='http://HOST:PORT',
+            help='Отправлять запросы по HTTP запущенному серверу.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Число параллельных клиентов в режиме --server.',
+        )
+
+    def handle(self, *args, **options):
+        """Выводит медиану, p95 и число новых соединений на запрос."""
+        if options['server']:
+            for url in options['urls']:
+                self.benchmark_server(url, options)
+            return
+        handler = WSGIHandler()
+        opened = {}
+
+        def on_connection_created(**kwargs):
+            # Соединение из пула тоже вызывает сигнал: считаем только
+            # новые объекты соединений DB-API.
+            connection = kwargs['connection'].connection
+            opened[id(connection)] = connection
+
+        connection_created.connect(on_connection_created)
+        try:
+            for url in options['urls']:
+                self.benchmark(handler, url, options, opened)
+        finally:
+            connection_created.disconnect(on_connection_created)
+
+    def benchmark(self, handler, url, options, opened):
+        """Замеряет один эндпоинт."""
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(status)
+
+        timings = []
+        for number in range(options['warmup'] + options['requests']):
+            if number == options['warmup']:
+                seen = len(opened)
+            started = time.perf_counter()
+            response = handler(
+                _environ(url, options['header']), start_response
+            )
+            b''.join(response)
+            response.close()
+            timings.append(time.perf_counter() - started)
+        if int(statuses[-1].split()[0]) >= 400:
+            raise CommandError(f'{url}: {statuses[-1]}')
+        timings = sorted(timings[options['warmup']:])
+        new_connections = (len(opened) - seen) / len(timings)
+        self.stdout.write(
+            f'{url:<40}'
+            f'median {statistics.median(timings) * 1000:7.2f} ms  '
+            f'p95 {_percentile(timings, 0.95) * 1000:7.2f} ms  '
+            f'new connections/request {new_connections:.2f}'
+        )
+
+    def benchmark_server(self, url, options):
+        """Нагружает эндпоинт запущенного сервера параллельными клиентами."""
+        server = urlsplit(options['server'])
+        headers = dict(
+            (part.strip() for part in header.split(':', 1))
+            for header in options['header']
+        )
+        total = options['warmup'] + options['requests']
+        counter = itertools.count()
+        timings = []
+        errors = []
+        lock = threading.Lock()
+
+        def client():
+            connection = http.client.HTTPConnection(
+                server.hostname, server.port, timeout=60
+            )
+            while (number := next(counter)) < total:
+                started = time.perf_counter()
+                connection.request('GET', url, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if response.status >= 400:
+                        errors.append(response.status)
+                    if number >= options['warmup']:
+                        timings.append(elapsed)
+            connection.close()
+
+        clients = [
+            threading.Thread(target=client)
+            for _ in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise CommandError(f'{url}: {len(errors)} ошибок, {errors[0]}')
+        timings.sort()
+        self.stdout.write(
+            f'{url:<40}'
+            f'{total / elapsed:8.1f} req/s  '
+            f'median {statistics.median(timings) * 1000:7.2f} ms  '
+            f'p95 {_percentile(timings, 0.95) * 1000:7.2f} ms  '
+            f'p99 {_percentile(timings, 0.99) * 1000:7.2f} ms'
+        )
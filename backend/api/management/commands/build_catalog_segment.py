@@ -0,0 +1,24 @@
+"""Сборка файла справочника тегов и ингредиентов."""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import catalog_segment
+
+
+class Command(BaseCommand):
+    """Собирает файл api.catalog_segment до запуска воркеров.
+
+    Без команды файл собирает первый обратившийся к справочнику процесс.
+    """
+
+    help = 'Собирает файл справочника тегов и ингредиентов.'
+
+    def add_arguments(self, parser):
+        """Параметры сборки."""
+        parser.add_argument('--path', default=settings.CATALOG_SEGMENT_PATH)
+
+    def handle(self, *args, **options):
+        """Записывает файл и выводит его размер."""
+        size = catalog_segment.write(options['path'])
+        self.stdout.write(f'{options["path"]}: {size} B')
@@ -0,0 +1,335 @@
+"""Проверка планов основных запросов API по сохранённым снимкам."""
+
+import difflib
+import json
+import re
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+
+from api import facets
+from api.constants import DEFAULT_PAGE_SIZE, SYNC_PAGE_SIZE
+from api.queries import shopping_cart_ingredients, user_subscriptions
+from api.views import RecipeViewSet
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    Tag,
+)
+from recipes.sync import portion, streams
+from users.models import User
+
+SNAPSHOT_DIR = Path(__file__).resolve().parents[2] / 'query_plans'
+
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_FULL_SCAN_RE = re.compile(
+    r'^(?:SCAN (?P<sqlite>\w+)$|Seq Scan on (?P<postgresql>\w+))'
+)
+_SORT_RE = re.compile(r'^(?:USE TEMP B-TREE FOR|Sort|Incremental Sort)\b')
+_TABLE_RE = re.compile(r'\b(?:SCAN|SEARCH|on) (\w+)')
+
+
+def _recipe_list(user, params=None):
+    """Запрос страницы списка рецептов так, как его строит RecipeViewSet."""
+    request = Request(RequestFactory().get('/api/recipes/', params or {}))
+    request.user = user
+    view = RecipeViewSet(
+        request=request, action='list', format_kwarg=None, args=(), kwargs={}
+    )
+    return view.filter_queryset(view.get_queryset())[:DEFAULT_PAGE_SIZE]
+
+
+def _recipe_facets(user, params=None):
+    """Запрос счётчиков тегов для фильтров списка рецептов."""
+    request = Request(RequestFactory().get('/api/recipes/', params or {}))
+    request.user = user
+    return facets.tag_counts_queryset(request, request.query_params)
+
+
+def _sync_portions(user, since):
+    """Запросы порций потоков синхронизации после момента ``since``."""
+    return {
+        f'sync_{name}': portion(
+            queryset, time_field, value_field, (since, 0), timezone.now(),
+            SYNC_PAGE_SIZE + 1,
+        )
+        for name, (queryset, time_field, value_field)
+        in streams(user).items()
+    }
+
+
+def core_querysets():
+    """Возвращает именованные основные запросы на текущих данных."""
+    user = (
+        User.objects.annotate(cart_size=Count('shopping_cart'))
+        .order_by('-cart_size', 'id').first()
+    )
+    author = (
+        User.objects.annotate(recipes_count=Count('recipes'))
+        .order_by('-recipes_count', 'id').first()
+    )
+    if user is None or author is None:
+        raise CommandError(
+            'Нет данных: сначала выполните generate_dataset.'
+        )
+    tags = list(Tag.objects.order_by('id').values_list('slug', flat=True)[:2])
+    recipe = Recipe.objects.order_by('id').first()
+    followed = list(
+        user.subscriptions.values_list('subscribed_user_id', flat=True)
+        [:DEFAULT_PAGE_SIZE]
+    )
+    ingredients = list(
+        RecipeIngredient.objects.values('ingredient_id').annotate(
+            recipes_count=Count('id')
+        ).order_by('-recipes_count', 'ingredient_id').values_list(
+            'ingredient_id', flat=True
+        )[:2]
+    )
+    week_ago = (timezone.now() - timedelta(days=7)).isoformat()
+    return {
+        'recipe_list': _recipe_list(user),
+        'recipe_list_compact': _recipe_list(user, {'compact': '1'}),
+        'recipe_list_author': _recipe_list(user, {'author': author.id}),
+        'recipe_list_tags': _recipe_list(user, {'tags': tags}),
+        'recipe_list_author_tags': _recipe_list(
+            user, {'author': author.id, 'tags': tags}
+        ),
+        'recipe_list_is_favorited': _recipe_list(
+            user, {'is_favorited': '1'}
+        ),
+        'recipe_list_is_in_shopping_cart': _recipe_list(
+            user, {'is_in_shopping_cart': '1'}
+        ),
+        'recipe_list_cooking_time': _recipe_list(
+            user, {'cooking_time_min': 10, 'cooking_time_max': 30}
+        ),
+        'recipe_list_published_at': _recipe_list(
+            user, {'published_at_after': week_ago}
+        ),
+        'recipe_list_ingredients': _recipe_list(
+            user, {'ingredients': ingredients}
+        ),
+        'recipe_list_exclude_ingredients': _recipe_list(
+            user, {'exclude_ingredients': ingredients}
+        ),
+        'recipe_list_combined_filters': _recipe_list(
+            user, {
+                'tags': tags,
+                'ingredients': ingredients[:1],
+                'exclude_ingredients': ingredients[1:],
+                'cooking_time_max': 30,
+            }
+        ),
+        'recipe_facets': _recipe_facets(user),
+        'recipe_facets_author': _recipe_facets(user, {'author': author.id}),
+        'recipe_facets_is_favorited': _recipe_facets(
+            user, {'is_favorited': '1'}
+        ),
+        'recipe_detail': Recipe.objects.filter(pk=getattr(recipe, 'pk', 0)),
+        'download_shopping_cart': shopping_cart_ingredients(user),
+        'subscriptions': user_subscriptions(user)[:DEFAULT_PAGE_SIZE],
+        'subscriptions_recipes': Recipe.objects.filter(
+            author_id__in=followed
+        ),
+        'short_link_redirect': Recipe.objects.filter(
+            short_link=getattr(recipe, 'short_link', '')
+        ),
+        'recipe_favorited_by': Favorite.objects.filter(
+            recipe=recipe
+        ).values('user_id'),
+        'recipe_in_shopping_carts': ShoppingCart.objects.filter(
+            recipe=recipe
+        ).values('user_id'),
+        'author_subscribers': Subscription.objects.filter(
+            subscribed_user=author
+        ).values('user_id'),
+        **_sync_portions(user, timezone.now() - timedelta(days=7)),
+    }
+
+
+def _normalize_sqlite(rows):
+    """Строки EXPLAIN QUERY PLAN в виде дерева с отступами."""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + _NUMBER_RE.sub('N', detail))
+    return lines
+
+
+def _normalize_postgresql(plan):
+    """Узлы EXPLAIN (FORMAT JSON) без стоимостей и оценок строк."""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    lines = []
+
+    def walk(node, depth):
+        parts = [node['Node Type']]
+        if 'Join Type' in node:
+            parts.append(f'({node["Join Type"]})')
+        if 'Strategy' in node:
+            parts.append(f'({node["Strategy"]})')
+        if 'Index Name' in node:
+            parts.append(f'using {node["Index Name"]}')
+        if 'Relation Name' in node:
+            parts.append(f'on {node["Relation Name"]}')
+        if 'Sort Key' in node:
+            parts.append(f'by {", ".join(node["Sort Key"])}')
+        lines.append('  ' * depth + ' '.join(parts))
+        for child in node.get('Plans', ()):
+            walk(child, depth + 1)
+
+    walk(plan[0]['Plan'], 0)
+    return lines
+
+
+def explain(queryset):
+    """Возвращает нормализованный план запроса."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            return _normalize_postgresql(cursor.fetchone()[0])
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return _normalize_sqlite(cursor.fetchall())
+    raise CommandError(f'СУБД {connection.vendor} не поддерживается.')
+
+
+class Command(BaseCommand):
+    """Сравнивает планы основных запросов со снимками в репозитории.
+
+    Падает, если в плане появилось полное сканирование или сортировка
+    на большой таблице, которых не было в снимке. Остальные изменения
+    плана выводятся как предупреждения.
+    """
+
+    help = 'Сравнивает планы основных запросов с сохранёнными снимками.'
+
+    def add_arguments(self, parser):
+        """Параметры проверки."""
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Перезаписать снимки текущими планами.',
+        )
+        parser.add_argument(
+            '--large-table-rows', type=int, default=10000,
+            help='Начиная с какого числа строк таблица считается большой.',
+        )
+        parser.add_argument(
+            '--no-analyze', action='store_true',
+            help='Не обновлять статистику планировщика перед проверкой.',
+        )
+        parser.add_argument(
+            '--benchmark', type=int, default=0, metavar='N',
+            help='Вместо проверки выполнить каждый запрос N раз '
+                 'и вывести медианное время.',
+        )
+
+    def handle(self, *args, **options):
+        """Снимает планы и сравнивает их со снимком."""
+        if not options['no_analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        querysets = core_querysets()
+        if options['benchmark']:
+            self.benchmark(querysets, options['benchmark'])
+            return
+        plans = {
+            name: explain(queryset) for name, queryset in querysets.items()
+        }
+        snapshot_path = SNAPSHOT_DIR / f'{connection.vendor}.json'
+        if options['update']:
+            SNAPSHOT_DIR.mkdir(exist_ok=True)
+            snapshot_path.write_text(
+                json.dumps(plans, ensure_ascii=False, indent=2,
+                           sort_keys=True) + '\n',
+                encoding='utf-8',
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Снимок сохранён: {snapshot_path}'
+            ))
+            return
+        if not snapshot_path.exists():
+            raise CommandError(
+                f'Нет снимка {snapshot_path}: выполните команду с --update.'
+            )
+        snapshot = json.loads(snapshot_path.read_text(encoding='utf-8'))
+        large_tables = self.large_tables(plans, options['large_table_rows'])
+        regressions = 0
+        for name, lines in plans.items():
+            expected = snapshot.get(name, [])
+            if lines == expected:
+                continue
+            self.stdout.write(self.style.WARNING(f'План изменился: {name}'))
+            for line in difflib.unified_diff(expected, lines, lineterm=''):
+                self.stdout.write(line)
+            known = self.issues(expected, large_tables)
+            for issue in self.issues(lines, large_tables) - known:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(
+                    f'  новая операция на большой таблице: {issue}'
+                ))
+        if regressions:
+            raise CommandError(f'Регрессий планов: {regressions}.')
+        self.stdout.write(self.style.SUCCESS('Регрессий планов нет.'))
+
+    def benchmark(self, querysets, repeat):
+        """Выводит медианное время выполнения каждого запроса."""
+        for name, queryset in querysets.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(
+                f'{name:<34}{statistics.median(timings) * 1000:10.2f} ms'
+            )
+
+    @staticmethod
+    def large_tables(plans, threshold):
+        """Таблицы из планов, в которых не меньше ``threshold`` строк."""
+        tables = {
+            match
+            for lines in plans.values()
+            for line in lines
+            for match in _TABLE_RE.findall(line)
+        } & set(connection.introspection.table_names())
+        large = set()
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+                )
+                if cursor.fetchone()[0] >= threshold:
+                    large.add(table)
+        return large
+
+    @staticmethod
+    def issues(lines, large_tables):
+        """Полные сканирования и сортировки, затрагивающие большие таблицы."""
+        touches_large = any(
+            table in large_tables
+            for line in lines
+            for table in _TABLE_RE.findall(line)
+        )
+        found = set()
+        for line in lines:
+            stripped = line.strip()
+            scan = _FULL_SCAN_RE.match(stripped)
+            if scan and (scan['sqlite'] or scan['postgresql']) in large_tables:
+                found.add(stripped)
+            elif touches_large and _SORT_RE.match(stripped):
+                found.add(stripped)
+        return found
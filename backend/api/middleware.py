@@ -0,0 +1,332 @@
+"""Middleware для API."""
+
+import hashlib
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+
+from . import compression, instrumentation, profiling
+from .routers import read_from_replica, replica_aliases
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """Добавляет заголовок Server-Timing и журналирует медленные запросы.
+
+    Этапы: ``db`` — SQL, ``serialize`` — сериализаторы (включая их
+    запросы), ``image`` — декодирование изображений, ``render`` —
+    рендеринг ответа, ``total`` — весь запрос.
+    """
+
+    def __init__(self, get_response):
+        """Подключается только при включённой настройке SERVER_TIMING."""
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.SLOW_REQUEST_THRESHOLD_MS / 1000
+
+    def __call__(self, request):
+        """Собирает тайминги на время обработки запроса."""
+        timings, token = instrumentation.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(
+                            instrumentation.record_query
+                        )
+                    )
+                response = self.get_response(request)
+        finally:
+            instrumentation.stop(token)
+        total = time.perf_counter() - timings.started
+        timings.add('total', total)
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            for name, duration in timings.durations.items()
+        )
+        if total >= self.threshold:
+            self.log_slow_request(request, timings)
+        return response
+
+    def process_template_response(self, request, response):
+        """Замеряет рендеринг ответов DRF и шаблонов."""
+        started = time.perf_counter()
+        timings = instrumentation.current()
+        if timings is not None:
+            response.add_post_render_callback(
+                lambda rendered: timings.add(
+                    'render', time.perf_counter() - started
+                )
+            )
+        return response
+
+    @staticmethod
+    def log_slow_request(request, timings):
+        """Пишет в журнал полный список SQL медленного запроса."""
+        lines = [
+            f'{request.method} {request.get_full_path()}: '
+            + ', '.join(
+                f'{name}={duration * 1000:.1f}ms'
+                for name, duration in timings.durations.items()
+            ),
+            f'{len(timings.queries)} queries:',
+        ]
+        lines.extend(
+            f'  {query["duration"] * 1000:8.2f}ms [{query["alias"]}] '
+            f'{query["call_site"]}: {query["sql"]}'
+            for query in timings.queries
+        )
+        duplicates = timings.duplicates()
+        if duplicates:
+            lines.append('duplicate queries:')
+        for fingerprint, queries in sorted(
+            duplicates.items(), key=lambda item: -len(item[1])
+        ):
+            call_sites = sorted({query['call_site'] for query in queries})
+            lines.append(
+                f'  x{len(queries)} '
+                f'{sum(q["duration"] for q in queries) * 1000:.2f}ms '
+                f'from {", ".join(map(str, call_sites))}: {fingerprint}'
+            )
+        logger.warning('\n'.join(lines))
+
+
+class ProfilerMiddleware:
+    """Профилирует запросы сотрудников по требованию.
+
+    Профиль запрашивается заголовком ``X-Profile`` или параметром
+    ``?profile=``: значение ``sample`` включает сэмплирующий
+    профилировщик, любое другое — cProfile. Имя сохранённого файла
+    возвращается в заголовке ``X-Profile-Id``.
+    """
+
+    def __init__(self, get_response):
+        """Подключается только при включённой настройке PROFILER_ENABLED."""
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Выполняет запрос под профилировщиком, если он запрошен."""
+        mode = (
+            request.headers.get('X-Profile')
+            or request.GET.get('profile')
+        )
+        if not mode or not self.is_staff(request):
+            return self.get_response(request)
+        response, profiler = profiling.profile_call(
+            mode, self.get_response, request
+        )
+        response['X-Profile-Id'] = profiling.save_profile(
+            request, mode, profiler
+        )
+        return response
+
+    @staticmethod
+    def is_staff(request):
+        """Проверяет сессию или токен API на принадлежность сотруднику."""
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+        for authentication_class in (
+            api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ):
+            try:
+                result = authentication_class().authenticate(request)
+            except APIException:
+                return False
+            if result is not None:
+                return result[0].is_staff
+        return False
+
+
+class ReplicaRoutingMiddleware:
+    """Направляет чтение в представлениях API на реплики.
+
+    Безопасные запросы к представлениям из ``REPLICA_VIEW_MODULES``
+    читают с реплик. После успешной записи клиент на
+    ``DB_REPLICA_STICKY_SECONDS`` секунд читает из основной базы, чтобы
+    видеть свои изменения несмотря на отставание реплик. Клиент
+    определяется по заголовку Authorization или cookie сессии, отметки
+    хранятся в общем для всех воркеров кэше (``REDIS_URL``).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    REPLICA_VIEW_MODULES = ('api.views', 'api.async_views')
+
+    def __init__(self, get_response):
+        """Подключается, только если настроены реплики."""
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.timeout = settings.DB_REPLICA_STICKY_SECONDS
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Выполняет запрос с выбором базы для чтения."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key = self.sticky_key(request)
+        if self.is_replica_view(request) and not (
+            key and cache.get(key)
+        ):
+            with read_from_replica():
+                return self.get_response(request)
+        response = self.get_response(request)
+        if self.is_write(request, response) and key:
+            cache.set(key, True, self.timeout)
+        return response
+
+    async def __acall__(self, request):
+        """Асинхронный вариант ``__call__``."""
+        key = self.sticky_key(request)
+        if self.is_replica_view(request) and not (
+            key and await cache.aget(key)
+        ):
+            with read_from_replica():
+                return await self.get_response(request)
+        response = await self.get_response(request)
+        if self.is_write(request, response) and key:
+            await cache.aset(key, True, self.timeout)
+        return response
+
+    def is_replica_view(self, request):
+        """Можно ли читать с реплик для этого запроса."""
+        if request.method not in SAFE_METHODS:
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.func.__module__ in self.REPLICA_VIEW_MODULES
+
+    @staticmethod
+    def is_write(request, response):
+        """Изменил ли запрос данные."""
+        return (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+        )
+
+    @staticmethod
+    def sticky_key(request):
+        """Ключ кэша с отметкой о недавней записи клиента."""
+        credentials = request.headers.get('Authorization') or (
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        )
+        if not credentials:
+            return None
+        digest = hashlib.sha256(credentials.encode()).hexdigest()
+        return f'replica-sticky:{digest}'
+
+
+class CompressionMiddleware:
+    """Сжимает ответы gzip, br или zstd по заголовку Accept-Encoding.
+
+    Из ``RESPONSE_COMPRESSION_ENCODINGS`` выбирается кодировка с
+    наибольшим q у клиента, при равных q — первая в настройке.
+    Сжимаются ответы с данными — JSON и выгрузки — не короче
+    ``RESPONSE_COMPRESSION_MIN_SIZE`` байт. Потоковые ответы сжимаются
+    по частям, и сжатое выталкивается клиенту после каждых
+    ``compression.STREAM_FLUSH_SIZE`` байт.
+
+    Против BREACH не сжимаются HTML-страницы, где рядом с токеном CSRF
+    бывает текст из запроса, и ответы, устанавливающие cookie: по ним
+    видно, что ответ использует токен CSRF или сессию.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    COMPRESSIBLE_TYPES = (
+        'application/json',
+        'application/x-ndjson',
+        'text/csv',
+    )
+
+    def __init__(self, get_response):
+        """Подключается при включённой настройке RESPONSE_COMPRESSION."""
+        self.encodings = compression.available_encodings(
+            settings.RESPONSE_COMPRESSION_ENCODINGS
+        )
+        if not settings.RESPONSE_COMPRESSION or not self.encodings:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.min_size = settings.RESPONSE_COMPRESSION_MIN_SIZE
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Сжимает ответ, если клиент это поддерживает."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        """Асинхронный вариант ``__call__``."""
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        """Подменяет тело ответа сжатым."""
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(
+            request.headers.get('Accept-Encoding', ''), self.encodings
+        )
+        if encoding is None:
+            return response
+        if response.streaming:
+            stream = (
+                compression.acompress_stream
+                if response.is_async else compression.compress_stream
+            )
+            response.streaming_content = stream(
+                encoding, response.streaming_content
+            )
+            del response.headers['Content-Length']
+        else:
+            started = time.perf_counter()
+            content = compression.compress(encoding, response.content)
+            timings = instrumentation.current()
+            if timings is not None:
+                timings.add('compress', time.perf_counter() - started)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # Сжатое тело побайтно отличается от исходного.
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def is_compressible(self, response):
+        """Стоит ли сжимать ответ независимо от клиента."""
+        if response.has_header('Content-Encoding'):
+            return False
+        if response.status_code < 200 or response.status_code in (204, 304):
+            return False
+        if response.cookies:
+            return False
+        content_type = response.get('Content-Type', '').lower()
+        if not content_type.startswith(self.COMPRESSIBLE_TYPES):
+            return False
+        return response.streaming or len(response.content) >= self.min_size
@@ -0,0 +1,45 @@
+"""Нормализованный ответ со списком рецептов.
+
+При ``normalized=1`` рецепты ссылаются на автора и теги по
+идентификатору, а сами авторы и теги сериализуются по одному разу на
+ответ в словарях ``authors`` и ``tags`` верхнего уровня с ключами —
+идентификаторами. Страница, где несколько авторов написали большую
+часть рецептов, становится короче и быстрее сериализуется.
+"""
+
+from .fieldsets import TRUE_VALUES
+from .serializers import TagSerializer, UserSerializer
+
+
+def is_normalized(request):
+    """Запрошен ли нормализованный ответ."""
+    return request.query_params.get(
+        'normalized', ''
+    ).lower() in TRUE_VALUES
+
+
+def _by_id(objects, serializer_class, context):
+    """Словарь сериализованных объектов по идентификатору."""
+    return {
+        str(obj.pk): data
+        for obj, data in zip(objects, serializer_class(
+            objects, many=True, context=context
+        ).data)
+    }
+
+
+def side_loaded(recipes, context):
+    """Авторы и теги рецептов ``recipes`` для нормализованного ответа."""
+    fields = context.get('recipe_fields')
+    data = {}
+    if fields is None or 'author' in fields:
+        authors = {recipe.author_id: recipe.author for recipe in recipes}
+        data['authors'] = _by_id(
+            list(authors.values()), UserSerializer, context
+        )
+    if fields is None or 'tags' in fields:
+        tags = {
+            tag.pk: tag for recipe in recipes for tag in recipe.tags.all()
+        }
+        data['tags'] = _by_id(list(tags.values()), TagSerializer, context)
+    return data
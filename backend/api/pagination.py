@@ -1,8 +1,16 @@
 """Настройки пагинации для API."""
 
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from datetime import datetime
 
-from .constants import DEFAULT_PAGE_SIZE
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.estimates import EstimatedCountPaginator
+
+from .constants import DEFAULT_PAGE_SIZE, MAX_FEED_PAGE_SIZE
 
 
 class PaginatorWithLimit(PageNumberPagination):
@@ -13,3 +21,80 @@ class PaginatorWithLimit(PageNumberPagination):
 
     page_size = DEFAULT_PAGE_SIZE
     page_size_query_param = "limit"
+
+
+class EstimatedCountPagination(PaginatorWithLimit):
+    """PaginatorWithLimit с оценкой ``count`` для больших таблиц.
+
+    Для queryset без условий на PostgreSQL ``count`` берётся из
+    статистики планировщика (recipes.estimates), если таблица не меньше
+    ``ESTIMATED_COUNT_THRESHOLD`` строк; иначе считается точно. Формат
+    ответа тот же: ``next`` определяется по лишней строке страницы, а
+    для ``page=last`` строки считаются точно.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_page_number(self, request, paginator):
+        """Номер страницы; для последней число строк считается точно."""
+        page_number = request.query_params.get(self.page_query_param)
+        if page_number in self.last_page_strings:
+            paginator.count_exactly()
+        return super().get_page_number(request, paginator)
+
+
+class FeedPagination(BasePagination):
+    """Keyset-пагинация ленты по (published_at, id) последнего рецепта.
+
+    Курсор не зависит от позиции в ленте, поэтому страницы не
+    съезжают при появлении новых записей.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_FEED_PAGE_SIZE
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        """Размер страницы из параметра ``limit``."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Позиция из параметра ``cursor`` или None для первой страницы."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            published_at, recipe_id = b64decode(
+                encoded.encode(), altchars=b'-_', validate=True
+            ).decode().split(' ')
+            return datetime.fromisoformat(published_at), int(recipe_id)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_entries(self, request, fetch):
+        """Страница записей: ``fetch(cursor, page_size)``."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.entries = fetch(self.decode_cursor(request), self.page_size)
+        return self.entries
+
+    def get_paginated_response(self, data):
+        """Ответ со ссылкой на следующую страницу."""
+        next_url = None
+        if len(self.entries) == self.page_size:
+            published_at, recipe_id = self.entries[-1]
+            cursor = b64encode(
+                f'{published_at.isoformat()} {recipe_id}'.encode(),
+                altchars=b'-_',
+            ).decode()
+            next_url = replace_query_param(
+                self.request.build_absolute_uri(),
+                self.cursor_query_param, cursor,
+            )
+        return Response({'next': next_url, 'results': data})
@@ -0,0 +1,173 @@
+"""Профилирование отдельных запросов и хранилище профилей.
+
+Профили складываются в ограниченное по размеру кольцо файлов в
+``settings.PROFILER_DIR``: при превышении ``PROFILER_MAX_FILES``
+удаляются самые старые. ``.prof`` — данные cProfile в формате pstats,
+``.collapsed`` — стеки сэмплирующего профилировщика в формате
+collapsed stacks (flamegraph.pl, speedscope).
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import render
+from django.utils import timezone
+
+PROFILE_EXTENSIONS = ('.prof', '.collapsed')
+
+_NAME_RE = re.compile(r'^[\w.-]+$')
+_SLUG_RE = re.compile(r'[^\w]+')
+
+
+class StackSampler:
+    """Сэмплирующий профилировщик стека одного потока."""
+
+    def __init__(self, interval):
+        """Готовит сэмплирование текущего потока с интервалом в секундах."""
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        """Запускает поток сэмплирования."""
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Останавливает поток сэмплирования."""
+        self._stopped.set()
+        self._sampler.join()
+
+    def _run(self):
+        """Периодически снимает стек профилируемого потока."""
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} '
+                    f'({os.path.basename(code.co_filename)}:'
+                    f'{code.co_firstlineno})'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump_stats(self, path):
+        """Записывает стеки в формате collapsed stacks."""
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.items():
+                file.write(f'{stack} {count}\n')
+
+
+def profile_call(mode, func, *args):
+    """Выполняет ``func`` под профилировщиком.
+
+    Возвращает результат вызова и профилировщик с методом
+    ``dump_stats``.
+    """
+    if mode == 'sample':
+        profiler = StackSampler(settings.PROFILER_SAMPLE_INTERVAL_MS / 1000)
+        with profiler:
+            result = func(*args)
+        return result, profiler
+    profiler = cProfile.Profile()
+    return profiler.runcall(func, *args), profiler
+
+
+def _profile_dir():
+    """Возвращает каталог профилей, создавая его при необходимости."""
+    path = Path(settings.PROFILER_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def list_profiles():
+    """Возвращает файлы профилей, начиная с самых новых."""
+    return sorted(
+        (
+            path for path in _profile_dir().iterdir()
+            if path.suffix in PROFILE_EXTENSIONS
+        ),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+
+
+def save_profile(request, mode, profiler):
+    """Сохраняет профиль запроса и удаляет лишние старые файлы."""
+    slug = _SLUG_RE.sub('-', request.path).strip('-') or 'root'
+    extension = '.collapsed' if mode == 'sample' else '.prof'
+    name = (
+        f'{time.strftime("%Y%m%d-%H%M%S")}-{time.time_ns() % 10**9:09d}-'
+        f'{request.method.lower()}-{slug[:80]}{extension}'
+    )
+    path = _profile_dir() / name
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    profiler.dump_stats(tmp_path)
+    os.replace(tmp_path, path)
+    for stale in list_profiles()[settings.PROFILER_MAX_FILES:]:
+        stale.unlink(missing_ok=True)
+    return name
+
+
+def _get_profile_path(name):
+    """Проверяет имя файла профиля и возвращает путь к нему."""
+    path = _profile_dir() / name
+    if (
+        not _NAME_RE.match(name)
+        or path.suffix not in PROFILE_EXTENSIONS
+        or not path.is_file()
+    ):
+        raise Http404('Профиль не найден.')
+    return path
+
+
+@staff_member_required
+def profile_list(request):
+    """Страница админки со списком сохранённых профилей."""
+    profiles = [
+        {
+            'name': path.name,
+            'size': path.stat().st_size,
+            'created': datetime.fromtimestamp(
+                path.stat().st_mtime, tz=timezone.get_current_timezone()
+            ),
+            'is_pstats': path.suffix == '.prof',
+        }
+        for path in list_profiles()
+    ]
+    return render(request, 'admin/profiles.html', {
+        'title': 'Профили запросов',
+        'profiles': profiles,
+        'max_files': settings.PROFILER_MAX_FILES,
+    })
+
+
+@staff_member_required
+def profile_download(request, name):
+    """Отдаёт файл профиля или текстовый отчёт pstats (``?as=text``)."""
+    path = _get_profile_path(name)
+    if path.suffix == '.prof' and request.GET.get('as') == 'text':
+        stream = io.StringIO()
+        stats = pstats.Stats(str(path), stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(100)
+        return HttpResponse(
+            stream.getvalue(), content_type='text/plain; charset=utf-8'
+        )
+    return FileResponse(path.open('rb'), as_attachment=True)
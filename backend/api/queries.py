@@ -0,0 +1,30 @@
+"""Основные запросы API, используемые представлениями.
+
+Вынесены отдельно, чтобы команда ``query_plans`` проверяла планы ровно
+тех запросов, которые выполняют представления.
+"""
+
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient, Subscription
+
+
+def shopping_cart_ingredients(user):
+    """Суммарное количество ингредиентов в корзине пользователя."""
+    return (
+        RecipeIngredient.objects
+        .filter(recipe__in_shopping_cart__user=user)
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(total_amount=Sum('amount'))
+        .order_by('ingredient__name')
+    )
+
+
+def user_subscriptions(user):
+    """Подписки пользователя, начиная с последних."""
+    return (
+        Subscription.objects.filter(user=user)
+        .select_related('subscribed_user')
+        .prefetch_related('subscribed_user__recipes')
+        .order_by('-id')
+    )
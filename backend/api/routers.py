@@ -0,0 +1,53 @@
+"""Маршрутизация запросов между основной базой и репликами."""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_aliases():
+    """Псевдонимы реплик из ``settings.DATABASES``."""
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+@contextmanager
+def read_from_replica():
+    """Направляет чтение внутри блока на реплики."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Читает с реплик внутри ``read_from_replica``, пишет в основную базу.
+
+    Реплики заполняются репликацией, поэтому миграции применяются
+    только к основной базе.
+    """
+
+    def db_for_read(self, model, **hints):
+        """Случайная реплика, если чтение разрешено с реплик."""
+        replicas = replica_aliases()
+        if _use_replica.get() and replicas:
+            return random.choice(replicas)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        """Все записи идут в основную базу."""
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Основная база и реплики содержат одни и те же данные."""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Миграции выполняются только в основной базе."""
+        return db == PRIMARY
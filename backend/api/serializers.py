@@ -3,6 +3,7 @@
 from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
 
+from recipes import ingredient_index
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -12,10 +13,39 @@ from recipes.models import (
     Subscription,
     Tag,
 )
+from recipes.sync import decode_cursor
 from users.models import User
 
+from . import catalog_segment
+from .constants import (
+    COOK_QUERY_MAX_INGREDIENTS,
+    MAX_SYNC_PAGE_SIZE,
+    RECIPE_BATCH_MAX_SIZE,
+    SYNC_PAGE_SIZE,
+)
+from .id_sets import FAVORITES, SHOPPING_CART, SUBSCRIPTIONS, get_id_set
+from .instrumentation import timed
+
+
+class TimedModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer, учитывающий сериализацию в этапе ``serialize``."""
+
+    def to_representation(self, instance):
+        """Сериализует объект, замеряя время."""
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+class TimedBase64ImageField(Base64ImageField):
+    """Base64ImageField с замером декодирования в этапе ``image``."""
+
+    def to_internal_value(self, data):
+        """Декодирует изображение, замеряя время."""
+        with timed('image'):
+            return super().to_internal_value(data)
+
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedModelSerializer):
     """Сериализатор для отображения информации о пользователе."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -38,15 +68,11 @@ class UserSerializer(serializers.ModelSerializer):
         """Проверяет, подписан ли текущий пользователь."""
         request = self.context.get('request')
         return bool(
-            request
-            and request.user.is_authenticated
-            and Subscription.objects.filter(
-                user=request.user, subscribed_user=obj
-            ).exists()
+            request and obj.id in get_id_set(request, SUBSCRIPTIONS)
         )
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedModelSerializer):
     """Сериализатор для ингредиентов."""
 
     class Meta:
@@ -73,6 +99,19 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
+    def to_representation(self, instance):
+        """Название и единица берутся из api.catalog_segment без JOIN."""
+        found = catalog_segment.current().ingredient(instance.ingredient_id)
+        if found is None:
+            ingredient = instance.ingredient
+            found = (ingredient.name, ingredient.measurement_unit)
+        return {
+            'id': instance.ingredient_id,
+            'name': found[0],
+            'measurement_unit': found[1],
+            'amount': instance.amount,
+        }
+
 
 class IngredientAmountCreateUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для ингредиентов при создании/обновлении рецепта."""
@@ -89,7 +128,7 @@ class IngredientAmountCreateUpdateSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedModelSerializer):
     """Сериализатор для тегов."""
 
     class Meta:
@@ -99,7 +138,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'slug')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedModelSerializer):
     """Сериализатор для рецептов."""
 
     tags = TagSerializer(many=True)
@@ -126,29 +165,44 @@ class RecipeSerializer(serializers.ModelSerializer):
             'ingredients',
         )
 
+    def get_fields(self):
+        """Поля, выбранные параметрами ``fields``, ``omit``, ``compact``.
+
+        В нормализованном ответе автор и теги заменяются
+        идентификаторами.
+        """
+        fields = super().get_fields()
+        if self.context.get('normalized'):
+            fields['author'] = serializers.PrimaryKeyRelatedField(
+                read_only=True
+            )
+            fields['tags'] = serializers.PrimaryKeyRelatedField(
+                many=True, read_only=True
+            )
+        selected = self.context.get('recipe_fields')
+        if selected is None:
+            return fields
+        return {
+            name: field for name, field in fields.items() if name in selected
+        }
+
     def get_is_favorited(self, obj):
         """Проверяет, добавлен ли рецепт в избранное."""
         request = self.context.get('request')
-        return bool(
-            request
-            and request.user.is_authenticated
-            and obj.favorited_by.filter(user=request.user).exists()
-        )
+        return bool(request and obj.id in get_id_set(request, FAVORITES))
 
     def get_is_in_shopping_cart(self, obj):
         """Проверяет, находится ли рецепт в корзине."""
         request = self.context.get('request')
         return bool(
-            request
-            and request.user.is_authenticated
-            and obj.in_shopping_cart.filter(user=request.user).exists()
+            request and obj.id in get_id_set(request, SHOPPING_CART)
         )
 
 
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и обновления рецепта."""
 
-    image = Base64ImageField(use_url=True)
+    image = TimedBase64ImageField(use_url=True)
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True
     )
@@ -219,7 +273,6 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         instance.tags.clear()
         instance.tags.set(tags)
 
-        instance.ingredients.clear()
         self._set_ingredients(instance, ingredients)
 
         return instance
@@ -227,6 +280,9 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     @staticmethod
     def _set_ingredients(recipe, ingredients):
         """Вспомогательный метод для обновления ингредиентов."""
+        previous_ids = list(
+            recipe.recipe_ingredients.values_list('ingredient_id', flat=True)
+        )
         recipe.recipe_ingredients.all().delete()
         RecipeIngredient.objects.bulk_create([
             RecipeIngredient(
@@ -236,13 +292,14 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             )
             for ingredient in ingredients
         ])
+        ingredient_index.invalidate_recipe(recipe.id, previous_ids)
 
     def to_representation(self, instance):
         """Преобразование объекта в JSON."""
         return RecipeSerializer(instance, context=self.context).data
 
 
-class RecipeDetailSerializer(serializers.ModelSerializer):
+class RecipeDetailSerializer(TimedModelSerializer):
     """Сериализатор для детализированного представления рецепта."""
 
     class Meta:
@@ -411,7 +468,7 @@ class SubscriptionCreateSerializer(serializers.ModelSerializer):
 class AvatarUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для обновления аватара пользователя."""
 
-    avatar = Base64ImageField(required=True)
+    avatar = TimedBase64ImageField(required=True)
 
     class Meta:
         """Мета-класс для настройки сериализатора."""
@@ -426,3 +483,61 @@ class AvatarUpdateSerializer(serializers.ModelSerializer):
                 {'avatar': 'Поле avatar обязательно для загрузки.'}
             )
         return data
+
+
+class CookQuerySerializer(serializers.Serializer):
+    """Параметры поиска рецептов по имеющимся ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=COOK_QUERY_MAX_INGREDIENTS,
+    )
+    include = serializers.ListField(
+        child=serializers.IntegerField(),
+        default=list,
+        max_length=COOK_QUERY_MAX_INGREDIENTS,
+    )
+    exclude = serializers.ListField(
+        child=serializers.IntegerField(),
+        default=list,
+        max_length=COOK_QUERY_MAX_INGREDIENTS,
+    )
+    min_coverage = serializers.FloatField(
+        min_value=0, max_value=1, default=0
+    )
+
+
+class RecipeBatchQuerySerializer(serializers.Serializer):
+    """Идентификаторы рецептов для пакетного получения."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPE_BATCH_MAX_SIZE,
+    )
+
+    def to_internal_value(self, data):
+        """Принимает как ``ids=1&ids=2``, так и ``ids=1,2``."""
+        return super().to_internal_value({'ids': [
+            part.strip()
+            for value in data.getlist('ids')
+            for part in value.split(',')
+            if part.strip()
+        ]})
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    """Параметры синхронизации изменений."""
+
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=MAX_SYNC_PAGE_SIZE, default=SYNC_PAGE_SIZE
+    )
+
+    def validate_cursor(self, value):
+        """Позиции потоков из курсора."""
+        try:
+            return decode_cursor(value)
+        except ValueError:
+            raise serializers.ValidationError('Неверный курсор.')
@@ -0,0 +1,66 @@
+"""Обработчики сигналов приложения API."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    ShoppingCart,
+    Subscription,
+    Tag,
+)
+from users.models import User
+
+from . import catalogs, id_sets
+from .authentication import invalidate_tokens
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Сбрасывает кэш токена при выходе из системы."""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Сбрасывает кэш токенов пользователя при изменении его данных.
+
+    Покрывает деактивацию и смену пароля.
+    """
+    update_fields = kwargs.get('update_fields')
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    invalidate_tokens(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags_catalog(sender, **kwargs):
+    """Сбрасывает готовый список тегов."""
+    catalogs.invalidate(catalogs.TAGS)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredients_catalog(sender, **kwargs):
+    """Сбрасывает готовый список ингредиентов."""
+    catalogs.invalidate(catalogs.INGREDIENTS)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_id_set(sender, instance, **kwargs):
+    """Сбрасывает набор идентификаторов пользователя."""
+    kind = next(
+        kind for kind, (model, _) in id_sets.SOURCES.items()
+        if model is sender
+    )
+    id_sets.invalidate(kind, instance.user_id)
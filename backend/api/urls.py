@@ -4,9 +4,11 @@
 ингредиентами и тегами. Также подключены маршруты Djoser для аутентификации.
 """
 
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
 app_name = 'api'
@@ -22,3 +24,34 @@ urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
     path('users/me/', UserViewSet.as_view({'get': 'me'}), name='user-me'),
 ]
+
+if settings.ASGI:
+    list_actions = {'get': 'list', 'post': 'create'}
+    detail_actions = {
+        'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
+        'delete': 'destroy',
+    }
+    urlpatterns = [
+        path('recipes/', async_views.read_view(
+            async_views.recipe_list, RecipeViewSet.as_view(list_actions)
+        )),
+        path('recipes/<int:pk>/', async_views.read_view(
+            async_views.recipe_detail, RecipeViewSet.as_view(detail_actions)
+        )),
+        path('tags/', async_views.read_view(
+            async_views.tag_list, TagViewSet.as_view({'get': 'list'})
+        )),
+        path('tags/<int:pk>/', async_views.read_view(
+            async_views.tag_detail, TagViewSet.as_view({'get': 'retrieve'})
+        )),
+        path('ingredients/', async_views.read_view(
+            async_views.ingredient_list,
+            IngredientViewSet.as_view({'get': 'list'}),
+        )),
+        path('ingredients/<int:pk>/', async_views.read_view(
+            async_views.ingredient_detail,
+            IngredientViewSet.as_view({'get': 'retrieve'}),
+        )),
+    ] + urlpatterns
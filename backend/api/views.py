@@ -1,9 +1,9 @@
 """ViewSet модули для API."""
 
 from datetime import datetime
+from functools import cached_property, partial
 
-from django.db.models import Sum
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
@@ -16,29 +16,44 @@ from rest_framework.permissions import (
 )
 from rest_framework.response import Response
 
+from recipes import ingredient_index
+from recipes.feed import feed_page
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
-    RecipeIngredient,
     ShoppingCart,
+    SimilarRecipe,
     Subscription,
     Tag,
 )
+from recipes.sync import changes, encode_cursor
 from users.models import User
 
+from . import catalogs, facets
+from .fieldsets import recipe_fields, recipe_queryset
 from .filters import IngredientSearchFilter, RecipeFilter
-from .pagination import PaginatorWithLimit
+from .id_sets import SUBSCRIPTIONS, get_id_set
+from .normalized import is_normalized, side_loaded
+from .pagination import (
+    EstimatedCountPagination,
+    FeedPagination,
+    PaginatorWithLimit,
+)
 from .permissions import IsAuthorOrAdminOrReadOnly
+from .queries import shopping_cart_ingredients, user_subscriptions
 from .serializers import (
     AvatarUpdateSerializer,
+    CookQuerySerializer,
     FavoriteSerializer,
     IngredientSerializer,
+    RecipeBatchQuerySerializer,
     RecipeCreateUpdateSerializer,
     RecipeSerializer,
     ShoppingCartSerializer,
     SubscriptionCreateSerializer,
     SubscriptionSerializer,
+    SyncQuerySerializer,
     TagSerializer,
     UserSerializer,
 )
@@ -51,12 +66,21 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Список тегов; без параметров — готовый ответ из api.catalogs."""
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return catalogs.get(
+            catalogs.TAGS, self.get_queryset(), self.get_serializer_class()
+        ).response(request)
+
 
 class UserViewSet(DjoserUserViewSet):
     """ViewSet для работы с пользователями."""
 
-    queryset = User.objects.all()
+    queryset = User.objects.order_by('id')
     serializer_class = UserSerializer
+    pagination_class = EstimatedCountPagination
 
     @action(
         detail=False,
@@ -107,14 +131,7 @@ class UserViewSet(DjoserUserViewSet):
         """Получение списка подписок текущего пользователя."""
         recipes_limit = int(request.query_params.get('recipes_limit', 3))
 
-        queryset = (
-            Subscription.objects.filter(user=request.user)
-            .select_related('subscribed_user')
-            .prefetch_related('subscribed_user__recipes')
-            .order_by('-id')
-        )
-
-        page = self.paginate_queryset(queryset)
+        page = self.paginate_queryset(user_subscriptions(request.user))
 
         serializer = SubscriptionSerializer(
             [subscription.subscribed_user for subscription in page],
@@ -176,11 +193,32 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     search_fields = ['^name']
 
+    def list(self, request, *args, **kwargs):
+        """Список ингредиентов; без фильтров — готовый ответ."""
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return catalogs.get(
+            catalogs.INGREDIENTS,
+            self.get_queryset(),
+            self.get_serializer_class(),
+        ).response(request)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
-    """ViewSet для управления рецептами с фильтрацией."""
+    """ViewSet для управления рецептами с фильтрацией.
+
+    Действия чтения учитывают параметры ``fields``, ``omit`` и
+    ``compact`` (см. ``api.fieldsets``), списки рецептов — ещё и
+    ``normalized`` (см. ``api.normalized``), а общий список — ``facets``
+    (см. ``api.facets``).
+    """
+
+    list_actions = ('list', 'feed', 'trending', 'similar', 'cook', 'batch')
+    read_actions = ('retrieve', 'sync', *list_actions)
 
     queryset = Recipe.objects.all()
+    # Как ``<int:pk>`` в маршрутах ASGI: нечисловой pk не доходит до ORM.
+    lookup_value_regex = r'\d+'
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrAdminOrReadOnly]
@@ -193,6 +231,58 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeCreateUpdateSerializer
         return RecipeSerializer
 
+    @cached_property
+    def selected_fields(self):
+        """Поля рецепта, запрошенные клиентом; None — все поля."""
+        if self.action not in self.read_actions:
+            return None
+        return recipe_fields(self.request, RecipeSerializer.Meta.fields)
+
+    def get_queryset(self):
+        """Рецепты со связями и столбцами, нужными для ответа."""
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            return recipe_queryset(queryset, self.selected_fields)
+        return queryset
+
+    def get_serializer_context(self):
+        """Контекст сериализатора с выбранными полями рецепта."""
+        return {
+            **super().get_serializer_context(),
+            'recipe_fields': self.selected_fields,
+            'normalized': (
+                self.action in self.list_actions
+                and is_normalized(self.request)
+            ),
+        }
+
+    def recipes_response(self, recipes, paginator=None, **extra):
+        """Ответ со списком рецептов, страницей ``paginator`` или без неё.
+
+        Ответ без пагинации с ``extra`` или нормализованный — объект с
+        рецептами в ``results``, как у страницы.
+        """
+        context = self.get_serializer_context()
+        data = RecipeSerializer(recipes, many=True, context=context).data
+        side = side_loaded(recipes, context) if context['normalized'] else {}
+        if paginator is not None:
+            response = paginator.get_paginated_response(data)
+            response.data.update(side)
+            return response
+        if not extra and not context['normalized']:
+            return Response(data)
+        return Response({'results': data, **extra, **side})
+
+    def list(self, request, *args, **kwargs):
+        """Страница рецептов с фильтрами и, по запросу, счётчиками тегов."""
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        response = self.recipes_response(page, self.paginator)
+        if facets.is_requested(request):
+            response.data['facets'] = facets.recipe_facets(request)
+        return response
+
     @action(
         detail=True,
         methods=['post'],
@@ -241,13 +331,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def download_shopping_cart(self, request):
         """Скачивание списка покупок."""
-        ingredients = (
-            RecipeIngredient.objects
-            .filter(recipe__in_shopping_cart__user=request.user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(total_amount=Sum('amount'))
-            .order_by('ingredient__name')
-        )
+        ingredients = shopping_cart_ingredients(request.user)
 
         shopping_list = [
             f'Список покупок для пользователя {request.user.username}',
@@ -272,6 +356,126 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
         return response
 
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        paginator = FeedPagination()
+        entries = paginator.paginate_entries(request, partial(
+            feed_page, request.user.id, get_id_set(request, SUBSCRIPTIONS)
+        ))
+        recipes = recipe_queryset(
+            Recipe.objects.all(), self.selected_fields
+        ).in_bulk([recipe_id for _, recipe_id in entries])
+        return self.recipes_response(
+            [
+                recipes[recipe_id] for _, recipe_id in entries
+                if recipe_id in recipes
+            ],
+            paginator,
+        )
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Популярные рецепты по предрассчитанным оценкам."""
+        queryset = self.filter_queryset(recipe_queryset(
+            Recipe.objects.filter(score__isnull=False).order_by(
+                '-score__score', '-id'
+            ),
+            self.selected_fields,
+        ))
+        return self.recipes_response(
+            self.paginate_queryset(queryset), self.paginator
+        )
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Рецепты, похожие на данный по ингредиентам и тегам."""
+        similar_ids = list(
+            SimilarRecipe.objects.filter(recipe_id=pk).order_by(
+                '-score', 'similar_id'
+            ).values_list('similar_id', flat=True)
+        )
+        if not similar_ids and not Recipe.objects.filter(id=pk).exists():
+            raise Http404
+        recipes = recipe_queryset(
+            Recipe.objects.all(), self.selected_fields
+        ).in_bulk(similar_ids)
+        return self.recipes_response([
+            recipes[recipe_id] for recipe_id in similar_ids
+            if recipe_id in recipes
+        ])
+
+    @action(detail=False, methods=['get'])
+    def cook(self, request):
+        """Рецепты из имеющихся ингредиентов по убыванию покрытия."""
+        query = CookQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        page = self.paginate_queryset(
+            ingredient_index.search(**query.validated_data)
+        )
+        recipes = recipe_queryset(
+            Recipe.objects.all(), self.selected_fields
+        ).in_bulk(page)
+        return self.recipes_response(
+            [recipes[recipe_id] for recipe_id in page if recipe_id in recipes],
+            self.paginator,
+        )
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """Рецепты по списку идентификаторов в порядке запроса.
+
+        Ненайденные идентификаторы перечисляются в ``missing``.
+        """
+        query = RecipeBatchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(query.validated_data['ids']))
+        recipes = recipe_queryset(
+            Recipe.objects.all(), self.selected_fields
+        ).in_bulk(ids)
+        return self.recipes_response(
+            [recipes[recipe_id] for recipe_id in ids if recipe_id in recipes],
+            missing=[
+                recipe_id for recipe_id in ids if recipe_id not in recipes
+            ],
+        )
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """Изменения рецептов, избранного и корзины после ``cursor``.
+
+        Без курсора отдаётся полная синхронизация. Следующую порцию
+        запрашивают с полученным ``cursor``, пока ``has_more`` истинно.
+        """
+        query = SyncQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        result = changes(
+            request.user,
+            query.validated_data.get('cursor'),
+            query.validated_data['limit'],
+        )
+        changed = result['changes'].pop('recipes')
+        recipes = recipe_queryset(
+            Recipe.objects.all(), self.selected_fields
+        ).in_bulk(changed)
+        serializer = RecipeSerializer(
+            [recipes[recipe_id] for recipe_id in changed
+             if recipe_id in recipes],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return Response({
+            'reset': result['reset'],
+            'recipes': serializer.data,
+            **result['changes'],
+            'cursor': encode_cursor(result['positions']),
+            'has_more': result['has_more'],
+        })
+
     @action(
         detail=True,
         methods=['post'],
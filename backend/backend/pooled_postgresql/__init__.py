@@ -0,0 +1 @@
+"""PostgreSQL-бэкенд с пулом соединений внутри процесса."""
@@ -0,0 +1,178 @@
+"""PostgreSQL-бэкенд, возвращающий соединения в пул вместо закрытия.
+
+Django закрывает соединение в конце каждого запроса (CONN_MAX_AGE=0).
+Здесь ``close()`` возвращает его в пул процесса, а следующий запрос
+берёт уже открытое соединение и сбрасывает состояние сессии.
+
+Настройки пула задаются ключом ``POOL`` в ``DATABASES``:
+
+- ``MAX_SIZE`` — максимум соединений на процесс;
+- ``TIMEOUT`` — сколько секунд ждать свободного соединения;
+- ``MAX_LIFETIME`` — через сколько секунд соединение пересоздаётся;
+- ``RESET_QUERY`` — запрос сброса сессии при выдаче из пула.
+
+Пулы привязаны к PID: после fork (gunicorn --preload) дочерний процесс
+не использует сокеты родителя, а создаёт свой пул.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+
+DEFAULT_POOL_OPTIONS = {
+    'MAX_SIZE': 4,
+    'TIMEOUT': 10,
+    'MAX_LIFETIME': 30 * 60,
+    'RESET_QUERY': 'DISCARD ALL',
+}
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений DB-API одного процесса."""
+
+    def __init__(self, max_size, timeout, max_lifetime):
+        """Создаёт пустой пул."""
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self._idle = deque()
+        self._created = {}
+        self._condition = threading.Condition()
+
+    def get(self, connect):
+        """Выдаёт свободное соединение или создаёт новое через ``connect``.
+
+        Возвращает пару (соединение, взято ли оно из пула).
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while not self._idle and len(self._created) >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise OperationalError(
+                        f'Нет свободных соединений в пуле '
+                        f'(MAX_SIZE={self.max_size}).'
+                    )
+            if self._idle:
+                return self._idle.pop(), True
+            # Резервируем место до подключения, чтобы не превысить лимит.
+            placeholder = object()
+            self._created[id(placeholder)] = None
+        try:
+            connection = connect()
+        except Exception:
+            self._forget(placeholder)
+            raise
+        with self._condition:
+            del self._created[id(placeholder)]
+            self._created[id(connection)] = time.monotonic()
+        return connection, False
+
+    def put(self, connection):
+        """Возвращает соединение в пул или закрывает его."""
+        created = self._created.get(id(connection))
+        expired = (
+            created is None
+            or time.monotonic() - created > self.max_lifetime
+        )
+        if expired or connection.closed or not self._rollback(connection):
+            self.discard(connection)
+            return
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def discard(self, connection):
+        """Закрывает соединение и освобождает его место в пуле."""
+        try:
+            connection.close()
+        finally:
+            self._forget(connection)
+
+    def _forget(self, connection):
+        """Освобождает место в пуле."""
+        with self._condition:
+            self._created.pop(id(connection), None)
+            self._condition.notify()
+
+    @staticmethod
+    def _rollback(connection):
+        """Откатывает незавершённую транзакцию соединения."""
+        try:
+            if connection.info.transaction_status:
+                connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options):
+    """Возвращает пул для базы ``alias`` в текущем процессе."""
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            # Пулы других PID унаследованы от родителя через fork.
+            for stale_key in [k for k in _pools if k[1] != key[1]]:
+                del _pools[stale_key]
+            _pools[key] = ConnectionPool(
+                max_size=options['MAX_SIZE'],
+                timeout=options['TIMEOUT'],
+                max_lifetime=options['MAX_LIFETIME'],
+            )
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """DatabaseWrapper PostgreSQL с пулом соединений."""
+
+    @property
+    def pool_options(self):
+        """Настройки пула с учётом значений по умолчанию."""
+        return {**DEFAULT_POOL_OPTIONS, **self.settings_dict.get('POOL', {})}
+
+    @property
+    def pool(self):
+        """Пул соединений этой базы в текущем процессе."""
+        return get_pool(self.alias, self.pool_options)
+
+    def get_new_connection(self, conn_params):
+        """Берёт соединение из пула и сбрасывает состояние сессии."""
+        pool = self.pool
+        while True:
+            connection, reused = pool.get(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params
+                )
+            )
+            if not reused:
+                return connection
+            try:
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(self.pool_options['RESET_QUERY'])
+            except base.Database.Error:
+                # Соединение разорвано, пока лежало в пуле.
+                pool.discard(connection)
+                continue
+            self.isolation_level = base.IsolationLevel(
+                self.settings_dict['OPTIONS'].get(
+                    'isolation_level', base.IsolationLevel.READ_COMMITTED
+                )
+            )
+            if self.isolation_level != base.IsolationLevel.READ_COMMITTED:
+                connection.isolation_level = self.isolation_level
+            return connection
+
+    def _close(self):
+        """Возвращает соединение в пул вместо закрытия."""
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
@@ -1,8 +1,10 @@
 """Настройки Django-проекта."""
 
 import os
+import tempfile
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from django.core.management.utils import get_random_secret_key
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -17,6 +19,38 @@ CSRF_TRUSTED_ORIGINS = os.getenv("CSRF_TRUSTED_ORIGINS", "").split(",")
 
 USE_SQLITE = os.getenv('USE_SQLITE', 'False').lower() in ('true', '1')
 
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'False').lower() in ('true', '1')
+
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv('SLOW_REQUEST_THRESHOLD_MS', 500))
+
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'False').lower() in (
+    'true', '1'
+)
+
+PROFILER_DIR = os.getenv('PROFILER_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+PROFILER_MAX_FILES = int(os.getenv('PROFILER_MAX_FILES', 50))
+
+PROFILER_SAMPLE_INTERVAL_MS = int(os.getenv('PROFILER_SAMPLE_INTERVAL_MS', 5))
+
+ASGI = os.getenv('ASGI', 'False').lower() in ('true', '1')
+
+RESPONSE_COMPRESSION = os.getenv(
+    'RESPONSE_COMPRESSION', 'False'
+).lower() in ('true', '1')
+
+RESPONSE_COMPRESSION_MIN_SIZE = int(
+    os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', 1024)
+)
+
+RESPONSE_COMPRESSION_ENCODINGS = [
+    encoding.strip()
+    for encoding in os.getenv(
+        'RESPONSE_COMPRESSION_ENCODINGS', 'zstd,br,gzip'
+    ).split(',')
+    if encoding.strip()
+]
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -34,6 +68,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,6 +78,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -77,6 +115,91 @@ DATABASES = {
     }
 }
 
+DB_POOL = os.getenv('DB_POOL', 'False').lower() in ('true', '1')
+
+if not USE_SQLITE and not ASGI:
+    # Под ASGI каждый запрос выполняет синхронный код в своём потоке,
+    # и постоянные соединения этих потоков не переиспользуются, а
+    # копятся до max_connections. Для ASGI используйте DB_POOL.
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': (
+            None if os.getenv('DB_CONN_MAX_AGE') == 'None'
+            else int(os.getenv('DB_CONN_MAX_AGE', 0))
+        ),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', 'False'
+        ).lower() in ('true', '1'),
+    })
+
+if DB_POOL and not USE_SQLITE:
+    DATABASES['default'].update({
+        'ENGINE': 'backend.pooled_postgresql',
+        # Пул сам держит соединения: Django закрывает их после запроса.
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 4)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+        },
+    })
+
+DB_REPLICAS = [
+    replica for replica in os.getenv('DB_REPLICAS', '').split(',') if replica
+]
+
+for number, replica in enumerate(DB_REPLICAS):
+    host, _, port = replica.partition(':')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        **({'NAME': replica} if USE_SQLITE else {
+            'HOST': host, 'PORT': port or DATABASES['default']['PORT'],
+        }),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+if DB_REPLICAS:
+    DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 10))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    } if os.getenv('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Кэш общий для воркеров, если это не локальный кэш процесса.
+SHARED_CACHE = not CACHES['default']['BACKEND'].endswith('LocMemCache')
+
+if DB_REPLICAS and not SHARED_CACHE:
+    # Отметки о недавней записи клиента должны видеть все воркеры,
+    # иначе после записи клиент читает с отстающей реплики.
+    raise ImproperlyConfigured('DB_REPLICAS требует общего кэша: REDIS_URL.')
+
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 5))
+
+TOKEN_CACHE_MAX_SIZE = int(os.getenv('TOKEN_CACHE_MAX_SIZE', 1024))
+
+TOKEN_CACHE_SHARED = os.getenv(
+    'TOKEN_CACHE_SHARED', str(bool(os.getenv('REDIS_URL')))
+).lower() in ('true', '1')
+
+TOKEN_CACHE_SHARED_TIMEOUT = int(os.getenv('TOKEN_CACHE_SHARED_TIMEOUT', 300))
+
+CATALOG_SEGMENT_PATH = os.getenv(
+    'CATALOG_SEGMENT_PATH',
+    os.path.join(tempfile.gettempdir(), 'foodgram-catalog.bin'),
+)
+
+# SQLite допускает одного писателя: фоновые записи в ленты упирались бы
+# в блокировки запроса, поэтому с ней задачи выполняются в запросе.
+FEED_BACKGROUND = os.getenv(
+    'FEED_BACKGROUND', str(not USE_SQLITE)
+).lower() in ('true', '1')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,11 +237,20 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.PaginatorWithLimit',
     'PAGE_SIZE': 6,
 }
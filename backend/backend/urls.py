@@ -5,15 +5,26 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api import async_views
+from api.profiling import profile_download, profile_list
 from api.views import RecipeViewSet
 
 urlpatterns = [
+    path('admin/profiles/', profile_list, name='profile-list'),
+    path('admin/profiles/<str:name>', profile_download,
+         name='profile-download'),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
     path('<str:short_link>/',
          RecipeViewSet.as_view({'get': 'short_link_redirect'})),
 ]
 
+if settings.ASGI:
+    urlpatterns[-1] = path('<str:short_link>/', async_views.read_view(
+        async_views.short_link_redirect,
+        RecipeViewSet.as_view({'get': 'short_link_redirect'}),
+    ))
+
 if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
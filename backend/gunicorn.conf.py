@@ -0,0 +1,31 @@
+"""Настройки gunicorn; читаются из рабочего каталога автоматически."""
+
+import os
+
+ASGI = os.getenv('ASGI', 'False').lower() in ('true', '1')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2 * os.cpu_count() + 1))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'False').lower() in ('true', '1')
+# Синхронный воркер, отдающий длинный ответ, убивается по таймауту.
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+if ASGI:
+    # Асинхронные представления чтения из api.async_views.
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi:application'
+
+
+def post_fork(server, worker):
+    """Отвязывает воркер от соединений с БД, открытых до fork.
+
+    Сокеты при --preload общие с мастером: закрывать их нельзя, иначе
+    сессия оборвётся и у мастера, поэтому ссылки просто забываются.
+    Пулы ``backend.pooled_postgresql`` привязаны к PID и пересоздаются.
+    """
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        connection.connection = None
@@ -1,10 +1,17 @@
 """Настройки админ-панели для приложения recipes."""
 
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ERROR_FLAG, PAGE_VAR, ChangeList
 from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import BadRequest, PermissionDenied
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.urls import path, reverse
 
 from users.models import User
 
+from . import estimates, exports
 from .models import (
     Favorite,
     Ingredient,
@@ -16,6 +23,105 @@ from .models import (
 )
 
 
+class LargeTableAdminMixin:
+    """Список без точного подсчёта строк всей таблицы.
+
+    Общее число строк без фильтров берётся из статистики PostgreSQL,
+    а подсчёт для ссылки «показать все» отключён.
+    """
+
+    paginator = estimates.EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ExportChangeList(ChangeList):
+    """Отфильтрованный queryset списка без подсчёта строк и страницы."""
+
+    def get_results(self, request):
+        """Выгрузке нужен весь queryset, а не страница."""
+
+
+class ExportAdminMixin:
+    """Выгрузка списка в CSV и JSONL из recipes.exports.
+
+    Действия выгружают выбранные строки, ссылки над списком — все
+    строки с текущими фильтрами, поиском и сортировкой.
+    """
+
+    export_fields = ()
+    export_format_param = 'format'
+    change_list_template = 'admin/export_change_list.html'
+    actions = ('export_csv', 'export_jsonl')
+
+    def _export_url_name(self):
+        """Имя маршрута выгрузки."""
+        opts = self.model._meta
+        return f'{opts.app_label}_{opts.model_name}_export'
+
+    def get_urls(self):
+        """Маршрут выгрузки перед маршрутами админки."""
+        return [
+            path(
+                'export/',
+                self.admin_site.admin_view(self.export_view),
+                name=self._export_url_name(),
+            ),
+            *super().get_urls(),
+        ]
+
+    def get_changelist(self, request, **kwargs):
+        """Для выгрузки — список без подсчёта строк."""
+        if getattr(request, 'export', False):
+            return ExportChangeList
+        return super().get_changelist(request, **kwargs)
+
+    def changelist_view(self, request, extra_context=None):
+        """Список со ссылками на выгрузку с текущими фильтрами."""
+        query = request.GET.copy()
+        for param in (PAGE_VAR, ERROR_FLAG):
+            query.pop(param, None)
+        url = reverse(f'admin:{self._export_url_name()}')
+        export_urls = {}
+        for export_format in exports.CONTENT_TYPES:
+            query[self.export_format_param] = export_format
+            export_urls[export_format] = f'{url}?{query.urlencode()}'
+        return super().changelist_view(request, {
+            **(extra_context or {}), 'export_urls': export_urls,
+        })
+
+    def export_view(self, request):
+        """Выгрузка всех строк списка с фильтрами из параметров."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        request.GET = request.GET.copy()
+        export_format = request.GET.pop(self.export_format_param, ['csv'])[-1]
+        if export_format not in exports.CONTENT_TYPES:
+            raise BadRequest('Неизвестный формат выгрузки.')
+        request.export = True
+        try:
+            queryset = self.get_changelist_instance(request).queryset
+        except IncorrectLookupParameters:
+            raise BadRequest('Неверные параметры фильтрации.')
+        return self.export(queryset, export_format)
+
+    def export(self, queryset, export_format):
+        """Потоковый ответ с полями ``export_fields``."""
+        return exports.export_response(
+            queryset, self.export_fields, export_format,
+            self.model._meta.model_name,
+        )
+
+    @admin.action(description='Выгрузить в CSV', permissions=('view',))
+    def export_csv(self, request, queryset):
+        """Выгрузка выбранных строк в CSV."""
+        return self.export(queryset, 'csv')
+
+    @admin.action(description='Выгрузить в JSONL', permissions=('view',))
+    def export_jsonl(self, request, queryset):
+        """Выгрузка выбранных строк в JSONL."""
+        return self.export(queryset, 'jsonl')
+
+
 class RecipeIngredientInline(admin.TabularInline):
     """Инлайн для ингредиентов в рецептах."""
 
@@ -34,65 +140,111 @@ class TagInline(admin.TabularInline):
 
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
     """Админ-панель для пользователей."""
 
     search_fields = ("email", "username")
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(ExportAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     """Админ-панель для рецептов."""
 
-    list_display = ("name", "author")
+    export_fields = (
+        "id", "name", "author_id", "author__username", "cooking_time",
+        "published_at",
+    )
+    list_display = ("name", "author", "get_favorites_count")
+    list_select_related = ("author",)
     search_fields = ("name", "author__username")
     list_filter = ("tags",)
+    autocomplete_fields = ("author",)
     inlines = [RecipeIngredientInline, TagInline]
 
+    def get_queryset(self, request):
+        """Рецепты с числом добавлений в избранное.
+
+        Число считается подзапросом только для строк страницы.
+        """
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(Subquery(
+                Favorite.objects.filter(recipe=OuterRef("pk"))
+                .order_by()
+                .values("recipe")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ), 0)
+        )
+
     def get_favorites_count(self, obj):
         """Получение количества добавлений в избранное."""
-        return obj.favorited_by.count()
+        return obj.favorites_count
 
     get_favorites_count.short_description = "В избранном"
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(ExportAdminMixin, admin.ModelAdmin):
     """Админ-панель для ингредиентов."""
 
+    export_fields = ("id", "name", "measurement_unit")
     list_display = ("name", "measurement_unit")
     search_fields = ("name",)
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Админ-панель для ингредиентов в рецепте."""
 
     list_display = ("recipe", "ingredient", "amount")
+    list_select_related = ("recipe", "ingredient")
+    autocomplete_fields = ("recipe", "ingredient")
     search_fields = ("recipe__name", "ingredient__name")
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(ExportAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     """Админ-панель для избранных рецептов."""
 
+    export_fields = (
+        "id", "user_id", "user__username", "recipe_id", "recipe__name",
+        "created_at",
+    )
     list_display = ("user", "recipe", "created_at")
+    list_select_related = ("user", "recipe")
+    autocomplete_fields = ("user", "recipe")
     search_fields = ("user__username", "recipe__name")
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(
+    ExportAdminMixin, LargeTableAdminMixin, admin.ModelAdmin
+):
     """Админ-панель для корзины покупок."""
 
+    export_fields = (
+        "id", "user_id", "user__username", "recipe_id", "recipe__name",
+        "created_at",
+    )
     list_display = ("user", "recipe")
+    list_select_related = ("user", "recipe")
+    autocomplete_fields = ("user", "recipe")
     search_fields = ("user__username", "recipe__name")
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(
+    ExportAdminMixin, LargeTableAdminMixin, admin.ModelAdmin
+):
     """Админ-панель для подписок."""
 
+    export_fields = (
+        "id", "user_id", "user__username", "subscribed_user_id",
+        "subscribed_user__username", "created_at",
+    )
     list_display = ("user", "subscribed_user", "created_at")
+    list_select_related = ("user", "subscribed_user")
+    autocomplete_fields = ("user", "subscribed_user")
     search_fields = ("user__username", "subscribed_user__username")
 
 
@@ -8,3 +8,7 @@ class RecipesConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        """Подключает обработчики сигналов."""
+        from . import signals  # noqa: F401
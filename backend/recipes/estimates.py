@@ -0,0 +1,131 @@
+"""Оценка числа строк таблицы по статистике планировщика.
+
+Точный ``COUNT(*)`` в PostgreSQL просматривает всю таблицу или индекс,
+и на таблицах в десятки миллионов строк занимает секунды. Для
+запросов без условий достаточно оценки ``pg_class.reltuples``, которую
+обновляют ``ANALYZE`` и autovacuum. Оценка используется, только если
+она не меньше ``ESTIMATED_COUNT_THRESHOLD``: небольшие таблицы и
+запросы с условиями считаются точно. Процесс хранит оценку каждой
+таблицы ``ESTIMATED_COUNT_CACHE_TIMEOUT`` секунд.
+
+Оценка бывает меньше или больше точного числа, поэтому пагинатор не
+проверяет номер страницы по ней: он читает на строку больше страницы,
+по лишней строке узнаёт, есть ли следующая, и уточняет ``count`` по
+прочитанному. На последней странице ``count`` точный.
+"""
+
+import time
+
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
+
+from api.constants import (
+    ESTIMATED_COUNT_CACHE_TIMEOUT,
+    ESTIMATED_COUNT_THRESHOLD,
+)
+
+_estimates = {}
+
+
+def is_unfiltered(queryset):
+    """Выбирает ли queryset все строки таблицы без повторов."""
+    query = queryset.query
+    return (
+        not query.where
+        and not query.distinct
+        and not query.is_sliced
+        and not query.combinator
+    )
+
+
+def _reltuples(connection, table):
+    """Оценка числа строк таблицы из pg_class или None."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(table)],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def estimated_count(queryset):
+    """Оценка числа строк таблицы queryset или None.
+
+    None — если СУБД не PostgreSQL или таблица ещё не анализировалась.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    key = (queryset.db, queryset.model._meta.db_table)
+    expires, estimate = _estimates.get(key, (0, None))
+    if expires <= time.monotonic():
+        estimate = _reltuples(connection, key[1])
+        _estimates[key] = (
+            time.monotonic() + ESTIMATED_COUNT_CACHE_TIMEOUT, estimate
+        )
+    return estimate
+
+
+def large_table_estimate(queryset):
+    """Оценка числа строк для большой таблицы без условий или None."""
+    if is_unfiltered(queryset):
+        estimate = estimated_count(queryset)
+        if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор с оценкой числа строк для больших таблиц без фильтров."""
+
+    @cached_property
+    def estimate(self):
+        """Оценка числа объектов или None, если они считаются точно."""
+        return large_table_estimate(self.object_list)
+
+    @cached_property
+    def count(self):
+        """Число объектов: оценка или точное значение."""
+        if self.estimate is not None:
+            return self.estimate
+        return self.object_list.count()
+
+    def _set_count(self, count):
+        """Заменяет ``count`` и сбрасывает число страниц."""
+        self.count = count
+        self.__dict__.pop('num_pages', None)
+
+    def count_exactly(self):
+        """Считает объекты точно вместо оценки."""
+        if self.estimate is not None:
+            self.estimate = None
+            self._set_count(self.object_list.count())
+
+    def validate_number(self, number):
+        """Номер страницы; при оценке верхняя граница не проверяется."""
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.estimate is None or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        """Страница ``number``; при оценке уточняет по ней ``count``."""
+        if self.estimate is None:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        if len(rows) > self.per_page:
+            self._set_count(max(self.count, bottom + len(rows)))
+        else:
+            self._set_count(bottom + len(rows))
+        return self._get_page(rows[:self.per_page], number, self)
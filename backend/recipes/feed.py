@@ -0,0 +1,251 @@
+"""Лента подписок с раскладкой рецептов подписчикам при публикации.
+
+Новый рецепт автора записывается в ``FeedEntry`` каждого подписчика
+пачками. Если при публикации у автора больше
+``FEED_FANOUT_MAX_FOLLOWERS`` подписчиков, он отмечается в
+``PopularAuthor``: рецепты популярных авторов не раскладываются, а при
+чтении ленты подтягиваются по индексу ``recipe_author_published_at_idx``.
+Отметка снимается, только когда после отписок подписчиков становится
+меньше ``FEED_FANOUT_RESUME_FOLLOWERS``: тогда оставшимся подписчикам
+раскладываются только рецепты, опубликованные с момента отметки. Разрыв
+между порогами не даёт автору, число подписчиков которого колеблется
+около порога, раз за разом раскладывать все рецепты. Лента каждого
+пользователя обрезается до ``FEED_MAX_LENGTH`` записей.
+
+Раскладка, подписка и отписка выполняются после фиксации транзакции
+в фоновом потоке процесса (``FEED_BACKGROUND``), по одной задаче за
+раз и в порядке поступления. Задачи, не выполненные до остановки
+процесса, восстанавливает команда ``rebuild_feeds``.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from api.constants import (
+    FEED_FANOUT_MAX_FOLLOWERS,
+    FEED_FANOUT_RESUME_FOLLOWERS,
+    FEED_MAX_LENGTH,
+    FEED_POPULAR_AUTHORS_CACHE_TIMEOUT,
+)
+
+from .models import FeedEntry, PopularAuthor, Recipe, Subscription
+
+POPULAR_AUTHORS_CACHE_KEY = 'feed:popular-authors'
+BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='feed')
+
+
+def _run(function, *args):
+    """Выполняет задачу ленты в фоновом потоке."""
+    try:
+        function(*args)
+    except Exception:
+        logger.exception('Не удалось обновить ленты: %s', function.__name__)
+    finally:
+        connections.close_all()
+
+
+def schedule(function, *args):
+    """Выполняет ``function(*args)`` после фиксации транзакции.
+
+    При ``FEED_BACKGROUND`` задача уходит в фоновый поток и не
+    задерживает ответ на запрос.
+    """
+    if settings.FEED_BACKGROUND:
+        transaction.on_commit(lambda: _executor.submit(_run, function, *args))
+    else:
+        transaction.on_commit(lambda: function(*args))
+
+
+def _batches(items, size=BATCH_SIZE):
+    """Делит список на части не длиннее ``size``."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def popular_author_ids():
+    """Авторы, чьи рецепты не раскладываются, а подтягиваются при чтении."""
+    author_ids = cache.get(POPULAR_AUTHORS_CACHE_KEY)
+    if author_ids is None:
+        author_ids = set(
+            PopularAuthor.objects.values_list('author_id', flat=True)
+        )
+        cache.set(
+            POPULAR_AUTHORS_CACHE_KEY, author_ids,
+            FEED_POPULAR_AUTHORS_CACHE_TIMEOUT,
+        )
+    return author_ids
+
+
+def trim_feeds(user_ids):
+    """Оставляет в лентах ``user_ids`` только FEED_MAX_LENGTH новых записей."""
+    stale = list(
+        FeedEntry.objects.filter(user_id__in=user_ids).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('user_id'),
+                order_by=[F('published_at').desc(), F('recipe_id').desc()],
+            )
+        ).filter(
+            position__gt=FEED_MAX_LENGTH
+        ).values_list('id', flat=True)
+    )
+    for batch in _batches(stale):
+        FeedEntry.objects.filter(id__in=batch).delete()
+
+
+def _add_entries(user_ids, recipes):
+    """Добавляет рецепты в ленты пользователей и обрезает их."""
+    for batch in _batches(user_ids):
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    author_id=author_id,
+                    published_at=published_at,
+                )
+                for user_id in batch
+                for recipe_id, author_id, published_at in recipes
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        trim_feeds(batch)
+
+
+def _follower_ids(author_id, limit):
+    """До ``limit`` подписчиков автора."""
+    return list(
+        Subscription.objects.filter(
+            subscribed_user_id=author_id
+        ).values_list('user_id', flat=True)[:limit]
+    )
+
+
+def fan_out(recipe_id, author_id, published_at):
+    """Раскладывает новый рецепт в ленты подписчиков автора.
+
+    Отметка популярности читается из базы: кэш другого процесса может
+    не знать, что она снята.
+    """
+    if PopularAuthor.objects.filter(author_id=author_id).exists():
+        return
+    follower_ids = _follower_ids(author_id, FEED_FANOUT_MAX_FOLLOWERS + 1)
+    if len(follower_ids) > FEED_FANOUT_MAX_FOLLOWERS:
+        PopularAuthor.objects.get_or_create(
+            author_id=author_id, defaults={'since': published_at}
+        )
+        cache.delete(POPULAR_AUTHORS_CACHE_KEY)
+        return
+    _add_entries(follower_ids, [(recipe_id, author_id, published_at)])
+
+
+def _latest_recipes(author_ids, since=None):
+    """Последние FEED_MAX_LENGTH рецептов авторов для записи в ленту.
+
+    ``since`` оставляет только опубликованные не раньше этого момента.
+    """
+    recipes = Recipe.objects.filter(author_id__in=author_ids)
+    if since is not None:
+        recipes = recipes.filter(published_at__gte=since)
+    return list(
+        recipes.order_by(
+            '-published_at', '-id'
+        ).values_list('id', 'author_id', 'published_at')[:FEED_MAX_LENGTH]
+    )
+
+
+def follow(user_id, author_id):
+    """Добавляет в ленту последние рецепты нового автора.
+
+    Рецепты популярного автора тоже записываются: они останутся в
+    ленте, если автор перестанет быть популярным.
+    """
+    _add_entries([user_id], _latest_recipes([author_id]))
+
+
+def unfollow(user_id, author_id):
+    """Убирает из ленты рецепты автора после отписки.
+
+    Если у популярного автора осталось меньше
+    FEED_FANOUT_RESUME_FOLLOWERS подписчиков, отметка снимается, а его
+    рецепты, которые с момента отметки подтягивались при чтении,
+    раскладываются оставшимся подписчикам.
+    """
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    popular = PopularAuthor.objects.filter(author_id=author_id).first()
+    if popular is None:
+        return
+    follower_ids = _follower_ids(author_id, FEED_FANOUT_RESUME_FOLLOWERS)
+    if len(follower_ids) >= FEED_FANOUT_RESUME_FOLLOWERS:
+        return
+    # Рецепты, опубликованные после снятия отметки, раскладывает fan_out.
+    popular.delete()
+    cache.delete(POPULAR_AUTHORS_CACHE_KEY)
+    _add_entries(
+        follower_ids, _latest_recipes([author_id], since=popular.since)
+    )
+
+
+def rebuild(user_id):
+    """Заново строит ленту пользователя по его подпискам."""
+    author_ids = list(
+        Subscription.objects.filter(
+            user_id=user_id
+        ).values_list('subscribed_user_id', flat=True)
+    )
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    if author_ids:
+        _add_entries([user_id], _latest_recipes(author_ids))
+
+
+def _before(queryset, recipe_field, cursor):
+    """Записи строго старше курсора (published_at, id)."""
+    if cursor is None:
+        return queryset
+    published_at, recipe_id = cursor
+    return queryset.filter(published_at__lte=published_at).filter(
+        Q(published_at__lt=published_at)
+        | Q(**{f'{recipe_field}__lt': recipe_id})
+    )
+
+
+def feed_page(user_id, followed_ids, cursor, limit):
+    """Страница ленты: до ``limit`` пар (published_at, recipe_id).
+
+    ``followed_ids`` — контейнер идентификаторов авторов, на которых
+    подписан пользователь; из него берутся популярные авторы, чьи
+    рецепты читаются напрямую. Обе выборки идут по индексам и
+    ограничены ``limit``, поэтому стоимость не зависит от числа
+    подписок.
+    """
+    entries = set(
+        _before(
+            FeedEntry.objects.filter(user_id=user_id), 'recipe_id', cursor
+        ).order_by(
+            '-published_at', '-recipe_id'
+        ).values_list('published_at', 'recipe_id')[:limit]
+    )
+    pulled_author_ids = [
+        author_id for author_id in popular_author_ids()
+        if author_id in followed_ids
+    ]
+    if pulled_author_ids:
+        entries.update(
+            _before(
+                Recipe.objects.filter(author_id__in=pulled_author_ids),
+                'id', cursor,
+            ).order_by(
+                '-published_at', '-id'
+            ).values_list('published_at', 'id')[:limit]
+        )
+    return sorted(entries, reverse=True)[:limit]
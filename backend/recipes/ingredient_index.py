@@ -0,0 +1,175 @@
+"""Обратный индекс ингредиентов для поиска «из того, что есть».
+
+Для каждого ингредиента в кэше Django хранится отсортированный массив
+идентификаторов рецептов с ним и параллельный массив с числом
+ингредиентов в каждом из этих рецептов. Покрытие рецепта набором
+ингредиентов — доля его ингредиентов, попавших в набор; оно, как и
+условия включения и исключения, вычисляется операциями над массивами
+без обращения к ``RecipeIngredient``.
+
+Списки строятся из базы при первом обращении и живут
+``INGREDIENT_INDEX_CACHE_TIMEOUT`` секунд. Ключ списка содержит
+поколение ингредиента из ``api.generations``. Любое изменение
+ингредиентов рецепта — через API, админку или каскадным удалением —
+меняет поколения всех его ингредиентов после фиксации транзакции, и
+список, прочитанный из базы до изменения, не вернётся в кэш под новым
+ключом. Без общего кэша (``REDIS_URL``) списки не кэшируются: смена
+поколений в локальном кэше процесса не видна другим воркерам.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from api import generations
+from api.constants import INGREDIENT_INDEX_CACHE_TIMEOUT
+
+from .models import RecipeIngredient
+
+
+class Posting:
+    """Рецепты с одним ингредиентом и число ингредиентов каждого."""
+
+    def __init__(self, recipe_ids, totals):
+        """Создаёт список из отсортированных массивов."""
+        self.recipe_ids = recipe_ids
+        self.totals = totals
+
+    @classmethod
+    def from_value(cls, value):
+        """Восстанавливает список из значения в кэше."""
+        recipe_ids, totals = value
+        return cls(
+            np.frombuffer(recipe_ids, dtype=np.int64),
+            np.frombuffer(totals, dtype=np.uint16),
+        )
+
+    def to_value(self):
+        """Значение для кэша."""
+        return self.recipe_ids.tobytes(), self.totals.tobytes()
+
+
+def _name(ingredient_id):
+    """Имя списка рецептов с ингредиентом."""
+    return f'ingredient-index:{ingredient_id}'
+
+
+def _cache_keys(ingredient_ids):
+    """Ключи кэша списков ``ingredient_ids`` в текущих поколениях."""
+    names = {
+        ingredient_id: _name(ingredient_id) for ingredient_id in ingredient_ids
+    }
+    current = generations.get_many(names.values())
+    return {
+        f'{name}:{current[name]}': ingredient_id
+        for ingredient_id, name in names.items()
+    }
+
+
+def _from_db(ingredient_ids):
+    """Списки рецептов для ингредиентов, прочитанные из базы."""
+    rows = RecipeIngredient.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).annotate(
+        total=Count('recipe__recipe_ingredients')
+    ).order_by(
+        'ingredient_id', 'recipe_id'
+    ).values_list('ingredient_id', 'recipe_id', 'total')
+    grouped = {ingredient_id: ([], []) for ingredient_id in ingredient_ids}
+    for ingredient_id, recipe_id, total in rows:
+        grouped[ingredient_id][0].append(recipe_id)
+        grouped[ingredient_id][1].append(total)
+    return {
+        ingredient_id: Posting(
+            np.array(recipe_ids, dtype=np.int64),
+            np.array(totals, dtype=np.uint16),
+        )
+        for ingredient_id, (recipe_ids, totals) in grouped.items()
+    }
+
+
+def load(ingredient_ids):
+    """Списки рецептов для ``ingredient_ids`` из кэша или из базы."""
+    if not settings.SHARED_CACHE:
+        return _from_db(ingredient_ids)
+    keys = _cache_keys(ingredient_ids)
+    postings = {
+        keys[key]: Posting.from_value(value)
+        for key, value in cache.get_many(keys).items()
+    }
+    missing = [
+        ingredient_id for ingredient_id in ingredient_ids
+        if ingredient_id not in postings
+    ]
+    if missing:
+        built = _from_db(missing)
+        cache.set_many(
+            {
+                key: built[ingredient_id].to_value()
+                for key, ingredient_id in keys.items()
+                if ingredient_id in built
+            },
+            INGREDIENT_INDEX_CACHE_TIMEOUT,
+        )
+        postings.update(built)
+    return postings
+
+
+def _ingredient_ids(recipe_id):
+    """Ингредиенты рецепта в базе."""
+    return set(
+        RecipeIngredient.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', flat=True)
+    )
+
+
+def invalidate_recipe(recipe_id, ingredient_ids=()):
+    """Сбрасывает списки ингредиентов рецепта после фиксации транзакции.
+
+    Сбрасываются списки текущих ингредиентов рецепта — в них меняется
+    число его ингредиентов — и ``ingredient_ids``, например бывших.
+    """
+    generations.bump(
+        _name(ingredient_id)
+        for ingredient_id in set(ingredient_ids) | _ingredient_ids(recipe_id)
+    )
+
+
+def search(ingredients, include=(), exclude=(), min_coverage=0):
+    """Рецепты из ингредиентов ``ingredients`` по убыванию покрытия.
+
+    Рецепт попадает в выдачу, если в нём есть хотя бы один ингредиент
+    из ``ingredients`` или ``include``, есть все из ``include``, нет
+    ни одного из ``exclude`` и покрытие не меньше ``min_coverage``.
+    При равном покрытии выше рецепты с большим числом совпадений.
+    """
+    available = set(ingredients) | set(include)
+    postings = load(available | set(exclude))
+    matching = [postings[ingredient_id] for ingredient_id in available]
+    if not matching:
+        return []
+    recipe_ids, first, matched = np.unique(
+        np.concatenate([posting.recipe_ids for posting in matching]),
+        return_index=True,
+        return_counts=True,
+    )
+    totals = np.concatenate([posting.totals for posting in matching])
+    coverage = matched / totals[first]
+    keep = coverage >= min_coverage
+    for ingredient_id in include:
+        keep &= np.isin(
+            recipe_ids, postings[ingredient_id].recipe_ids,
+            assume_unique=True,
+        )
+    for ingredient_id in exclude:
+        keep &= ~np.isin(
+            recipe_ids, postings[ingredient_id].recipe_ids,
+            assume_unique=True,
+        )
+    recipe_ids, matched, coverage = (
+        recipe_ids[keep], matched[keep], coverage[keep]
+    )
+    order = np.lexsort((-recipe_ids, -matched, -coverage))
+    return recipe_ids[order].tolist()
@@ -0,0 +1,39 @@
+"""Пересчёт похожих рецептов."""
+
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import build_similar_recipes
+
+
+class Command(BaseCommand):
+    """Находит для каждого рецепта самые похожие по ингредиентам и тегам.
+
+    Запускается периодически: рецепты, добавленные после последнего
+    запуска, получают соседей только при следующем.
+    """
+
+    help = 'Пересчитывает похожие рецепты.'
+
+    def add_arguments(self, parser):
+        """Размер куска и число процессов."""
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Число рецептов, обрабатываемых за одно умножение.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Число процессов (по умолчанию — по числу ядер).',
+        )
+
+    def handle(self, *args, **options):
+        """Запускает пересчёт."""
+        count = build_similar_recipes(
+            chunk_size=options['chunk_size'], workers=options['workers']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано рецептов: {count}.')
+        )
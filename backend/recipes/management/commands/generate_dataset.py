@@ -0,0 +1,203 @@
+"""Генерация синтетического набора данных для бенчмарков."""
+
+import random
+import string
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api import catalogs
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    Tag,
+)
+from users.models import User
+
+SHORT_LINK_ALPHABET = string.digits + string.ascii_letters
+
+
+def _short_link(number):
+    """Короткая ссылка длиной 8 символов, не пересекающаяся с обычными."""
+    chars = []
+    for _ in range(7):
+        number, remainder = divmod(number, len(SHORT_LINK_ALPHABET))
+        chars.append(SHORT_LINK_ALPHABET[remainder])
+    return 'g' + ''.join(reversed(chars))
+
+
+class Command(BaseCommand):
+    """Создаёт пользователей, рецепты, избранное, корзины и подписки.
+
+    Данные детерминированы при одинаковом ``--seed``. Первый созданный
+    пользователь — «тяжёлый»: у него в десять раз больше избранного,
+    корзины и подписок, чем в среднем.
+    """
+
+    help = 'Генерирует синтетический набор данных для бенчмарков.'
+
+    def add_arguments(self, parser):
+        """Параметры размера набора данных."""
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=12)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        """Создаёт набор данных в одной транзакции."""
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if User.objects.filter(username__startswith='gen_').exists():
+            raise CommandError('Набор данных уже сгенерирован.')
+        with transaction.atomic():
+            tags = self.create_tags(options['tags'])
+            ingredients = self.create_ingredients(options['ingredients'])
+            # bulk_create не отправляет сигналы.
+            catalogs.invalidate(catalogs.TAGS)
+            catalogs.invalidate(catalogs.INGREDIENTS)
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(
+                users, tags, ingredients, options
+            )
+            self.create_pairs(
+                Favorite, users, recipes, 'recipe_id',
+                options['favorites_per_user'],
+            )
+            self.create_pairs(
+                ShoppingCart, users, recipes, 'recipe_id',
+                options['cart_per_user'],
+            )
+            self.create_pairs(
+                Subscription, users, users, 'subscribed_user_id',
+                options['subscriptions_per_user'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {len(users)} пользователей, {len(recipes)} рецептов.'
+        ))
+
+    def create_tags(self, count):
+        """Дополняет теги до ``count`` штук."""
+        existing = Tag.objects.count()
+        Tag.objects.bulk_create(
+            Tag(name=f'gen tag {number}', slug=f'gen-tag-{number}')
+            for number in range(existing, count)
+        )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_ingredients(self, count):
+        """Дополняет ингредиенты до ``count`` штук."""
+        existing = Ingredient.objects.count()
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(
+                    name=f'gen ingredient {number}',
+                    measurement_unit=self.rng.choice(('г', 'мл', 'шт')),
+                )
+                for number in range(existing, count)
+            ),
+            batch_size=self.batch_size,
+        )
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def create_users(self, count):
+        """Создаёт пользователей без пароля для входа."""
+        password = make_password(None)
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'gen_{number}',
+                    email=f'gen_{number}@example.com',
+                    first_name='Gen',
+                    last_name=str(number),
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        return list(
+            User.objects.filter(username__startswith='gen_')
+            .order_by('id').values_list('id', flat=True)
+        )
+
+    def create_recipes(self, users, tags, ingredients, options):
+        """Создаёт рецепты с тегами и ингредиентами."""
+        now = timezone.now()
+        offset = Recipe.objects.count()
+        seconds = options['days'] * 24 * 60 * 60
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author_id=self.rng.choice(users),
+                    name=f'Рецепт {offset + number}',
+                    image='recipes_images/generated.png',
+                    text='Сгенерированный рецепт. ' * 20,
+                    cooking_time=self.rng.randint(1, 180),
+                    published_at=now - timedelta(
+                        seconds=self.rng.randrange(seconds)
+                    ),
+                    short_link=_short_link(offset + number),
+                )
+                for number in range(options['recipes'])
+            ),
+            batch_size=self.batch_size,
+        )
+        recipe_ids = [recipe.id for recipe in recipes]
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in self.rng.sample(
+                    tags, min(len(tags), self.rng.randint(1, 3))
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        per_recipe = min(options['ingredients_per_recipe'], len(ingredients))
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.rng.randint(1, 500),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in self.rng.sample(
+                    ingredients, self.rng.randint(1, per_recipe)
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        return recipe_ids
+
+    def create_pairs(self, model, users, targets, target_field, per_user):
+        """Создаёт уникальные пары пользователь — объект."""
+        rows = []
+        for index, user_id in enumerate(users):
+            count = per_user * 10 if index == 0 else self.rng.randint(
+                0, per_user * 2
+            )
+            for target_id in self.rng.sample(
+                targets, min(count, len(targets))
+            ):
+                if target_id != user_id or target_field == 'recipe_id':
+                    rows.append(
+                        model(user_id=user_id, **{target_field: target_id})
+                    )
+        model.objects.bulk_create(
+            rows, batch_size=self.batch_size, ignore_conflicts=True
+        )
@@ -0,0 +1,22 @@
+"""Удаление устаревших отметок об удалении."""
+
+from django.core.management.base import BaseCommand
+
+from recipes.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    """Удаляет отметки старше SYNC_TOMBSTONE_RETENTION_DAYS дней.
+
+    Рассчитана на ежедневный запуск. Клиенты с более старой позицией
+    синхронизации получают полную синхронизацию.
+    """
+
+    help = 'Удаляет устаревшие отметки об удалении.'
+
+    def handle(self, *args, **options):
+        """Запускает очистку."""
+        count = prune_tombstones()
+        self.stdout.write(
+            self.style.SUCCESS(f'Удалено отметок: {count}.')
+        )
@@ -0,0 +1,27 @@
+"""Построение лент подписок по текущим подпискам."""
+
+from django.core.management.base import BaseCommand
+
+from recipes import feed
+from recipes.models import Subscription
+
+
+class Command(BaseCommand):
+    """Заново строит ленты всех пользователей с подписками.
+
+    Нужна после массовой загрузки данных, минующей сигналы (например,
+    generate_dataset), и после изменения FEED_MAX_LENGTH.
+    """
+
+    help = 'Заново строит ленты подписок пользователей.'
+
+    def handle(self, *args, **options):
+        """Перестраивает ленты по одному пользователю."""
+        user_ids = Subscription.objects.values_list(
+            'user_id', flat=True
+        ).distinct().order_by('user_id')
+        count = 0
+        for user_id in user_ids.iterator():
+            feed.rebuild(user_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Перестроено лент: {count}.'))
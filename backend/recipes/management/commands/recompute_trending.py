@@ -0,0 +1,30 @@
+"""Пересчёт оценок популярности рецептов."""
+
+from django.core.management.base import BaseCommand
+
+from recipes import trending
+
+
+class Command(BaseCommand):
+    """Обновляет оценки для выдачи «в тренде».
+
+    Инкрементальный пересчёт рассчитан на запуск каждые несколько
+    минут, полный (``--full``) — раз в сутки.
+    """
+
+    help = 'Пересчитывает оценки популярности рецептов.'
+
+    def add_arguments(self, parser):
+        """Режим пересчёта."""
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Построить оценки заново, учитывая удаления.',
+        )
+
+    def handle(self, *args, **options):
+        """Запускает пересчёт."""
+        count = trending.recompute(full=options['full'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено оценок рецептов: {count}.')
+        )
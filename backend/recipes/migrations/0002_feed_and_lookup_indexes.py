@@ -0,0 +1,68 @@
+# Generated by Django 4.2 on 2026-10-19 07:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import recipes.operations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ['-published_at', '-id'], 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+        recipes.operations.AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['published_at', 'id'], name='recipe_published_at_idx'),
+        ),
+        recipes.operations.AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['author', 'published_at', 'id'], name='recipe_author_published_at_idx'),
+        ),
+        recipes.operations.AddIndexConcurrently(
+            model_name='favorite',
+            index=models.Index(fields=['recipe', 'user'], name='favorite_recipe_user_idx'),
+        ),
+        recipes.operations.AddIndexConcurrently(
+            model_name='shoppingcart',
+            index=models.Index(fields=['recipe', 'user'], name='shopping_cart_recipe_user_idx'),
+        ),
+        recipes.operations.AddIndexConcurrently(
+            model_name='subscription',
+            index=models.Index(fields=['subscribed_user', 'user'], name='subscription_author_user_idx'),
+        ),
+        recipes.operations.AddUniqueIndexConcurrently(
+            model_name='recipe',
+            constraint=models.UniqueConstraint(condition=models.Q(('short_link__isnull', False)), fields=('short_link',), name='unique_recipe_short_link'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Автор рецепта'),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='recipe',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='favorited_by', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='recipe',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='in_shopping_cart', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='subscription',
+            name='subscribed_user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subscribers', to=settings.AUTH_USER_MODEL, verbose_name='На кого подписан'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-19 08:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import recipes.operations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0005_similar_recipe'),
+    ]
+
+    operations = [
+        recipes.operations.AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', 'published_at', 'id'], name='recipe_cooking_time_idx'),
+        ),
+        recipes.operations.AddIndexConcurrently(
+            model_name='recipeingredient',
+            index=models.Index(fields=['ingredient', 'recipe'], name='recipe_ingredient_lookup_idx'),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='ingredient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_recipes', to='recipes.ingredient', verbose_name='Ингредиент'),
+        ),
+    ]
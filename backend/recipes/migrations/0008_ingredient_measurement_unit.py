@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_sync_tracking'),
+    ]
+
+    # Модель Ingredient лишилась choices и default у measurement_unit
+    # раньше, чем появились эти миграции, а 0001_initial их ещё содержит.
+    # В базе Django их не хранит, поэтому меняется только состояние.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='ingredient',
+                    name='measurement_unit',
+                    field=models.CharField(max_length=64, verbose_name='Единица измерения'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2 on 2026-10-19 09:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Min
+
+# FEED_FANOUT_MAX_FOLLOWERS на момент миграции.
+FANOUT_MAX_FOLLOWERS = 1000
+
+
+def mark_popular_authors(apps, schema_editor):
+    """Отмечает авторов, чьи рецепты уже не раскладывались в ленты."""
+    PopularAuthor = apps.get_model('recipes', 'PopularAuthor')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('recipes', 'Subscription')
+    author_ids = Subscription.objects.values('subscribed_user').annotate(
+        followers=Count('id')
+    ).filter(
+        followers__gt=FANOUT_MAX_FOLLOWERS
+    ).values_list('subscribed_user', flat=True)
+    first_published = dict(
+        Recipe.objects.filter(author_id__in=author_ids).values(
+            'author_id'
+        ).annotate(first=Min('published_at')).values_list('author_id', 'first')
+    )
+    PopularAuthor.objects.bulk_create(
+        PopularAuthor(author_id=author_id, since=first)
+        for author_id, first in first_published.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_first_name_alter_user_last_name_and_more'),
+        ('recipes', '0009_catalog_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('since', models.DateTimeField(verbose_name='Рецепты не раскладываются с')),
+            ],
+            options={
+                'verbose_name': 'Популярный автор',
+                'verbose_name_plural': 'Популярные авторы',
+            },
+        ),
+        migrations.RunPython(mark_popular_authors, migrations.RunPython.noop),
+    ]
@@ -66,6 +66,7 @@ class Recipe(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='recipes',
+        db_index=False,
         verbose_name='Автор рецепта'
     )
     name = models.CharField(
@@ -111,6 +112,10 @@ class Recipe(models.Model):
         default=timezone.now,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     short_link = models.CharField(
         max_length=MAX_SHORT_LINK_LENGTH,
         blank=True,
@@ -137,7 +142,32 @@ class Recipe(models.Model):
     class Meta:
         """Мета-класс для настройки порядка и отображения рецептов."""
 
-        ordering = ['-published_at']
+        ordering = ['-published_at', '-id']
+        indexes = [
+            models.Index(
+                fields=['published_at', 'id'],
+                name='recipe_published_at_idx'
+            ),
+            models.Index(
+                fields=['author', 'published_at', 'id'],
+                name='recipe_author_published_at_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', 'published_at', 'id'],
+                name='recipe_cooking_time_idx'
+            ),
+            models.Index(
+                fields=['updated_at', 'id'],
+                name='recipe_updated_at_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['short_link'],
+                condition=models.Q(short_link__isnull=False),
+                name='unique_recipe_short_link'
+            )
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -159,6 +189,7 @@ class RecipeIngredient(models.Model):
         Ingredient,
         on_delete=models.CASCADE,
         related_name='ingredient_recipes',
+        db_index=False,
         verbose_name='Ингредиент'
     )
     amount = models.PositiveSmallIntegerField(
@@ -189,6 +220,12 @@ class RecipeIngredient(models.Model):
                 name='unique_recipe_ingredient'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['ingredient', 'recipe'],
+                name='recipe_ingredient_lookup_idx'
+            )
+        ]
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
 
@@ -214,6 +251,7 @@ class Favorite(models.Model):
         Recipe,
         on_delete=models.CASCADE,
         related_name='favorited_by',
+        db_index=False,
         verbose_name='Рецепт'
     )
     created_at = models.DateTimeField(
@@ -230,6 +268,16 @@ class Favorite(models.Model):
                 name='unique_favorite'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='favorite_recipe_user_idx'
+            ),
+            models.Index(
+                fields=['user', 'created_at', 'id'],
+                name='favorite_user_created_idx'
+            ),
+        ]
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
 
@@ -251,6 +299,7 @@ class ShoppingCart(models.Model):
         Recipe,
         on_delete=models.CASCADE,
         related_name='in_shopping_cart',
+        db_index=False,
         verbose_name='Рецепт'
     )
     created_at = models.DateTimeField(
@@ -267,6 +316,16 @@ class ShoppingCart(models.Model):
                 name='unique_shopping_cart'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='shopping_cart_recipe_user_idx'
+            ),
+            models.Index(
+                fields=['user', 'created_at', 'id'],
+                name='shopping_cart_user_created_idx'
+            ),
+        ]
         verbose_name = 'Рецепт в списке покупок'
         verbose_name_plural = 'Список покупок'
 
@@ -288,6 +347,7 @@ class Subscription(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='subscribers',
+        db_index=False,
         verbose_name='На кого подписан'
     )
     created_at = models.DateTimeField(
@@ -304,9 +364,256 @@ class Subscription(models.Model):
                 name='unique_subscription'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['subscribed_user', 'user'],
+                name='subscription_author_user_idx'
+            )
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
     def __str__(self):
         """Возвращает строковое представление подписки."""
         return f'{self.user} подписан на {self.subscribed_user}'
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок: рецепт автора, на которого подписан user.
+
+    Записи раскладываются подписчикам при публикации рецепта, поэтому
+    лента читается по индексу одного пользователя.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        db_index=False,
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False,
+        verbose_name='Автор рецепта'
+    )
+    published_at = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        """Мета-класс для настройки записей ленты."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'published_at', 'recipe'],
+                name='feed_entry_user_published_idx'
+            )
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self):
+        """Возвращает строковое представление записи ленты."""
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class PopularAuthor(models.Model):
+    """Автор, чьи рецепты не раскладываются в ленты, а читаются из них.
+
+    Запись появляется, когда у автора больше FEED_FANOUT_MAX_FOLLOWERS
+    подписчиков, и удаляется, когда их становится меньше
+    FEED_FANOUT_RESUME_FOLLOWERS (см. ``recipes.feed``).
+    """
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    since = models.DateTimeField(
+        verbose_name='Рецепты не раскладываются с'
+    )
+
+    class Meta:
+        """Мета-класс для настройки популярных авторов."""
+
+        verbose_name = 'Популярный автор'
+        verbose_name_plural = 'Популярные авторы'
+
+    def __str__(self):
+        """Возвращает строковое представление популярного автора."""
+        return f'{self.author} с {self.since}'
+
+
+class RecipeScore(models.Model):
+    """Оценка популярности рецепта для выдачи «в тренде».
+
+    Хранится в форме прямого затухания (см. ``recipes.trending``):
+    порядок по ``score`` совпадает с порядком по затухающей оценке на
+    любой момент времени, поэтому значения не нужно пересчитывать
+    по мере старения.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField(verbose_name='Оценка')
+    updated_at = models.DateTimeField(verbose_name='Учтены события до')
+
+    class Meta:
+        """Мета-класс для настройки оценок рецептов."""
+
+        indexes = [
+            models.Index(
+                fields=['-score', '-recipe'],
+                name='recipe_score_idx'
+            )
+        ]
+        verbose_name = 'Оценка рецепта'
+        verbose_name_plural = 'Оценки рецептов'
+
+    def __str__(self):
+        """Возвращает строковое представление оценки рецепта."""
+        return f'{self.recipe}: {self.score}'
+
+
+class SimilarRecipe(models.Model):
+    """Похожий рецепт, найденный командой build_similar_recipes."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_entries',
+        db_index=False,
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        """Мета-класс для настройки похожих рецептов."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx'
+            )
+        ]
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        """Возвращает строковое представление похожего рецепта."""
+        return f'{self.similar} похож на {self.recipe}'
+
+
+class Tombstone(models.Model):
+    """Отметка об удалении для синхронизации клиентов.
+
+    Удалённый рецепт отмечается записью без пользователя, удаление
+    рецепта из избранного или корзины — записью с пользователем.
+    """
+
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    KIND_CHOICES = (
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+    )
+
+    kind = models.CharField(
+        max_length=16,
+        choices=KIND_CHOICES,
+        verbose_name='Что удалено'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        db_index=False,
+        verbose_name='Пользователь'
+    )
+    recipe_id = models.BigIntegerField(verbose_name='Идентификатор рецепта')
+    deleted_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата удаления'
+    )
+
+    class Meta:
+        """Мета-класс для настройки отметок об удалении."""
+
+        indexes = [
+            models.Index(
+                fields=['kind', 'user', 'deleted_at', 'id'],
+                name='tombstone_sync_idx'
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                name='tombstone_deleted_at_idx'
+            ),
+        ]
+        verbose_name = 'Отметка об удалении'
+        verbose_name_plural = 'Отметки об удалении'
+
+    def __str__(self):
+        """Возвращает строковое представление отметки."""
+        return f'{self.kind} {self.recipe_id} удалён {self.deleted_at}'
+
+
+class CatalogVersion(models.Model):
+    """Версия справочника тегов или ингредиентов.
+
+    Меняется в одной транзакции с изменением справочника, поэтому все
+    воркеры видят одну и ту же версию данных.
+    """
+
+    name = models.CharField(
+        max_length=32,
+        primary_key=True,
+        verbose_name='Справочник'
+    )
+    version = models.CharField(max_length=32, verbose_name='Версия')
+
+    class Meta:
+        """Мета-класс для настройки версий справочников."""
+
+        verbose_name = 'Версия справочника'
+        verbose_name_plural = 'Версии справочников'
+
+    def __str__(self):
+        """Возвращает строковое представление версии."""
+        return f'{self.name}: {self.version}'
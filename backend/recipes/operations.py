@@ -0,0 +1,67 @@
+"""Операции миграций, создающие индексы без блокировки записи.
+
+В PostgreSQL индексы создаются с ``CONCURRENTLY``, поэтому миграции с
+этими операциями должны быть неатомарными (``atomic = False``). В
+остальных СУБД операции ведут себя как обычные AddIndex/AddConstraint.
+"""
+
+from django.db.migrations.operations import AddConstraint, AddIndex
+
+
+def _is_postgresql(schema_editor):
+    """Проверяет, что миграция применяется к PostgreSQL."""
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+class AddIndexConcurrently(AddIndex):
+    """Добавляет индекс, в PostgreSQL — с CONCURRENTLY."""
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        """Создаёт индекс."""
+        if not _is_postgresql(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        """Удаляет индекс."""
+        if not _is_postgresql(schema_editor):
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+class AddUniqueIndexConcurrently(AddConstraint):
+    """Добавляет условное UniqueConstraint, в PostgreSQL — с CONCURRENTLY.
+
+    Ограничение обязано иметь ``condition``: тогда Django хранит его как
+    уникальный индекс, и его можно создать без блокировки таблицы.
+    """
+
+    def __init__(self, model_name, constraint):
+        """Проверяет, что ограничение создаётся как индекс."""
+        if constraint.condition is None:
+            raise ValueError('UniqueConstraint должен иметь condition.')
+        super().__init__(model_name, constraint)
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        """Создаёт уникальный индекс."""
+        if not _is_postgresql(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            sql = str(self.constraint.create_sql(model, schema_editor))
+            schema_editor.execute(sql.replace(
+                'CREATE UNIQUE INDEX', 'CREATE UNIQUE INDEX CONCURRENTLY', 1
+            ))
@@ -0,0 +1,77 @@
+"""Обработчики сигналов приложения рецептов."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import feed, ingredient_index
+from .models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    Tombstone,
+)
+
+TOMBSTONE_KINDS = {
+    Favorite: Tombstone.FAVORITE,
+    ShoppingCart: Tombstone.SHOPPING_CART,
+}
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, raw=False, **kwargs):
+    """Раскладывает новый рецепт в ленты подписчиков."""
+    if created and not raw:
+        feed.schedule(
+            feed.fan_out,
+            instance.id, instance.author_id, instance.published_at,
+        )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def reindex_recipe(sender, instance, **kwargs):
+    """Сбрасывает индекс ингредиентов изменённого рецепта."""
+    ingredient_index.invalidate_recipe(
+        instance.recipe_id, [instance.ingredient_id]
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def bury_recipe(sender, instance, **kwargs):
+    """Отмечает удаление рецепта для синхронизации клиентов."""
+    Tombstone.objects.create(kind=Tombstone.RECIPE, recipe_id=instance.id)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def bury_user_recipe(sender, instance, origin=None, **kwargs):
+    """Отмечает удаление рецепта из избранного или корзины.
+
+    При каскадном удалении вместе с рецептом или пользователем отметка
+    не нужна: клиент узнает об удалении самого рецепта.
+    """
+    if isinstance(origin, sender) or getattr(origin, 'model', None) is sender:
+        Tombstone.objects.create(
+            kind=TOMBSTONE_KINDS[sender],
+            user_id=instance.user_id,
+            recipe_id=instance.recipe_id,
+        )
+
+
+@receiver(post_save, sender=Subscription)
+def follow_author(sender, instance, created, raw=False, **kwargs):
+    """Добавляет рецепты автора в ленту нового подписчика."""
+    if created and not raw:
+        feed.schedule(
+            feed.follow, instance.user_id, instance.subscribed_user_id
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def unfollow_author(sender, instance, **kwargs):
+    """Убирает рецепты автора из ленты после отписки."""
+    feed.schedule(
+        feed.unfollow, instance.user_id, instance.subscribed_user_id
+    )
@@ -0,0 +1,207 @@
+"""Поиск похожих рецептов по ингредиентам и тегам.
+
+Рецепты представляются строками разреженной матрицы: столбцы —
+ингредиенты с весом IDF (редкие ингредиенты важнее соли) и теги с
+весом ``SIMILAR_RECIPES_TAG_WEIGHT``. После нормировки строк сходство
+двух рецептов — скалярное произведение строк.
+
+Теги и частые ингредиенты общие у большой части рецептов, и
+произведение матриц по ним было бы почти плотным. Поэтому кандидаты в
+похожие — рецепты с общим редким ингредиентом: их дают произведения
+столбцов редких ингредиентов кусками по ``chunk_size`` строк. Редким
+считается ингредиент не больше чем из
+``SIMILAR_RECIPES_MAX_INGREDIENT_SHARE`` рецептов, но не меньше
+``SIMILAR_RECIPES_MIN_RARE_COUNT``, чтобы в небольшом каталоге
+кандидаты были. Остальные столбцы тоже разрежены, и их вклад
+досчитывается только для найденных пар. Рецепты без редких
+ингредиентов сравниваются со всеми по остальным столбцам блоками не
+больше ``FALLBACK_PAIRS`` пар. Куски распределяются по процессам.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+import numpy as np
+from django.db import connections, transaction
+from scipy import sparse
+
+from api.constants import (
+    SIMILAR_RECIPES_COUNT,
+    SIMILAR_RECIPES_MAX_INGREDIENT_SHARE,
+    SIMILAR_RECIPES_MIN_RARE_COUNT,
+    SIMILAR_RECIPES_TAG_WEIGHT,
+)
+
+from .models import Recipe, RecipeIngredient, SimilarRecipe
+
+BATCH_SIZE = 5000
+FALLBACK_PAIRS = 10 ** 7
+
+_matrices = None
+
+
+def _pairs(queryset, fields):
+    """Пары идентификаторов из базы в виде двух массивов."""
+    pairs = np.fromiter(
+        chain.from_iterable(
+            queryset.values_list(*fields).iterator(chunk_size=BATCH_SIZE)
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _columns(recipe_ids, row_ids, feature_ids):
+    """Строки и столбцы матрицы для пар (рецепт, признак)."""
+    features, columns = np.unique(feature_ids, return_inverse=True)
+    return np.searchsorted(recipe_ids, row_ids), columns, len(features)
+
+
+def build_matrix():
+    """Нормированные признаки и идентификаторы строк.
+
+    Признаки возвращаются двумя разреженными матрицами: редких
+    ингредиентов и остальных столбцов — тегов и частых ингредиентов.
+    """
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True),
+        dtype=np.int64,
+    )
+    rows, columns, ingredients_count = _columns(
+        recipe_ids,
+        *_pairs(RecipeIngredient.objects, ('recipe_id', 'ingredient_id')),
+    )
+    ingredients = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, columns)),
+        shape=(len(recipe_ids), ingredients_count),
+    )
+    # Повторы ингредиента в рецепте считаются одним вхождением.
+    ingredients.data[:] = 1
+    frequency = np.asarray(ingredients.sum(axis=0)).ravel()
+    idf = np.log((1 + len(recipe_ids)) / (1 + frequency)) + 1
+    ingredients = ingredients @ sparse.diags(idf)
+
+    rows, columns, tags_count = _columns(
+        recipe_ids,
+        *_pairs(Recipe.tags.through.objects, ('recipe_id', 'tag_id')),
+    )
+    tags = sparse.csr_matrix(
+        (np.full(len(rows), SIMILAR_RECIPES_TAG_WEIGHT), (rows, columns)),
+        shape=(len(recipe_ids), tags_count),
+    )
+    matrix = sparse.hstack([ingredients, tags], format='csr')
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = (sparse.diags(1 / norms) @ matrix).tocsc()
+    rare_frequency = max(
+        SIMILAR_RECIPES_MAX_INGREDIENT_SHARE * len(recipe_ids),
+        SIMILAR_RECIPES_MIN_RARE_COUNT,
+    )
+    rare = np.concatenate([
+        frequency <= rare_frequency, np.zeros(tags_count, dtype=bool)
+    ])
+    return matrix[:, rare].tocsr(), matrix[:, ~rare].tocsr(), recipe_ids
+
+
+def _init_worker(candidates, common):
+    """Передаёт признаки процессу-обработчику один раз."""
+    global _matrices
+    _matrices = candidates, common
+
+
+def _top(sources, targets, scores, count):
+    """Первые ``count`` соседей каждой строки по убыванию сходства."""
+    keep = sources != targets
+    sources, targets, scores = sources[keep], targets[keep], scores[keep]
+    # Сходство не больше 1, поэтому ключ упорядочивает пары по строке,
+    # а внутри строки — по убыванию сходства; при равном сходстве
+    # устойчивая сортировка сохраняет порядок соседей по возрастанию.
+    order = np.argsort(sources * 4 - scores, kind='stable')
+    sources, targets, scores = sources[order], targets[order], scores[order]
+    # Номер пары внутри строки: оставляются первые ``count`` соседей.
+    firsts = np.searchsorted(sources, sources)
+    keep = np.arange(len(sources)) - firsts < count
+    return sources[keep], targets[keep], scores[keep]
+
+
+def _common_neighbors(rows, count):
+    """Ближайшие соседи строк ``rows`` только по общим столбцам."""
+    _, common = _matrices
+    block = max(1, FALLBACK_PAIRS // max(common.shape[0], 1))
+    for position in range(0, len(rows), block):
+        block_rows = rows[position:position + block]
+        pairs = (common[block_rows] @ common.T).tocsr()
+        pairs.sort_indices()
+        pairs = pairs.tocoo()
+        yield _top(block_rows[pairs.row], pairs.col, pairs.data, count)
+
+
+def _top_neighbors(bounds, count=SIMILAR_RECIPES_COUNT):
+    """Границы куска и ближайшие соседи его строк.
+
+    Соседи возвращаются тремя массивами: строка, строка соседа и
+    сходство, по убыванию сходства внутри каждой строки.
+    """
+    candidates, common = _matrices
+    start, end = bounds
+    pairs = (candidates[start:end] @ candidates.T).tocsr()
+    pairs.sort_indices()
+    pairs = pairs.tocoo()
+    sources, targets = pairs.row + start, pairs.col
+    scores = pairs.data + np.asarray(
+        common[sources].multiply(common[targets]).sum(axis=1)
+    ).ravel()
+    found = [_top(sources, targets, scores, count)]
+    # Строки без редких ингредиентов кандидатов не получили.
+    lonely = start + np.flatnonzero(
+        np.diff(candidates.indptr[start:end + 1]) == 0
+    )
+    found.extend(_common_neighbors(lonely, count))
+    sources, targets, scores = (
+        np.concatenate(arrays) for arrays in zip(*found)
+    )
+    return start, end, sources, targets, scores
+
+
+def _save(recipe_ids, result):
+    """Заменяет соседей рецептов одного куска."""
+    start, end, sources, targets, scores = result
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(
+            recipe_id__in=recipe_ids[start:end].tolist()
+        ).delete()
+        SimilarRecipe.objects.bulk_create(
+            (
+                SimilarRecipe(recipe_id=source, similar_id=target, score=score)
+                for source, target, score in zip(
+                    recipe_ids[sources].tolist(),
+                    recipe_ids[targets].tolist(),
+                    scores.tolist(),
+                )
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+
+def build_similar_recipes(chunk_size=1000, workers=None):
+    """Пересчитывает похожие рецепты и возвращает число рецептов."""
+    candidates, common, recipe_ids = build_matrix()
+    chunks = [
+        (start, min(start + chunk_size, len(recipe_ids)))
+        for start in range(0, len(recipe_ids), chunk_size)
+    ]
+    if workers == 1:
+        _init_worker(candidates, common)
+        for bounds in chunks:
+            _save(recipe_ids, _top_neighbors(bounds))
+        return len(recipe_ids)
+    # Процессы-обработчики не обращаются к базе; открытые соединения
+    # не должны наследоваться ими при fork.
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker,
+        initargs=(candidates, common),
+    ) as executor:
+        for result in executor.map(_top_neighbors, chunks):
+            _save(recipe_ids, result)
+    return len(recipe_ids)
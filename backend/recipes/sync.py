@@ -0,0 +1,183 @@
+"""Изменения рецептов, избранного и корзины с позиции клиента.
+
+Изменения читаются из нескольких потоков, каждый из которых — таблица,
+упорядоченная по времени и идентификатору: рецепты по ``updated_at``,
+избранное и корзина по ``created_at``, удаления по
+``Tombstone.deleted_at``. Позиция клиента в потоке — последняя
+полученная пара (время, id), следующая порция читается диапазоном
+индекса после неё. Прочитанный до конца поток переходит на позицию
+«после момента ``until``».
+
+Строки моложе ``SYNC_COMMIT_LAG_SECONDS`` не отдаются: транзакция,
+начатая раньше, может закоммитить строку с более ранним временем уже
+после того, как клиент прочитал более поздние. Отметки об удалении
+хранятся ``SYNC_TOMBSTONE_RETENTION_DAYS`` дней; клиенту с более
+старой позицией нужна полная синхронизация.
+"""
+
+import json
+from base64 import b64decode, b64encode
+from datetime import datetime, timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from api.constants import (
+    SYNC_COMMIT_LAG_SECONDS,
+    SYNC_TOMBSTONE_RETENTION_DAYS,
+)
+
+from .models import Favorite, Recipe, ShoppingCart, Tombstone
+
+
+def _removed(user, kind, model):
+    """Отметки об удалении рецептов из набора, не добавленных снова."""
+    return Tombstone.objects.filter(kind=kind, user=user).exclude(Exists(
+        model.objects.filter(user=user, recipe_id=OuterRef('recipe_id'))
+    ))
+
+
+def streams(user):
+    """Потоки изменений: имя — (queryset, поле времени, поле рецепта)."""
+    result = {
+        'recipes': (Recipe.objects.all(), 'updated_at', 'id'),
+        'deleted_recipes': (
+            Tombstone.objects.filter(kind=Tombstone.RECIPE, user=None),
+            'deleted_at',
+            'recipe_id',
+        ),
+    }
+    if user.is_authenticated:
+        result.update({
+            'favorites': (
+                Favorite.objects.filter(user=user), 'created_at', 'recipe_id'
+            ),
+            'removed_favorites': (
+                _removed(user, Tombstone.FAVORITE, Favorite),
+                'deleted_at',
+                'recipe_id',
+            ),
+            'shopping_cart': (
+                ShoppingCart.objects.filter(user=user),
+                'created_at',
+                'recipe_id',
+            ),
+            'removed_from_shopping_cart': (
+                _removed(user, Tombstone.SHOPPING_CART, ShoppingCart),
+                'deleted_at',
+                'recipe_id',
+            ),
+        })
+    return result
+
+
+def encode_cursor(positions):
+    """Курсор клиента из позиций потоков."""
+    return b64encode(
+        json.dumps({
+            name: [timestamp.isoformat(), last_id]
+            for name, (timestamp, last_id) in positions.items()
+        }).encode(),
+        altchars=b'-_',
+    ).decode()
+
+
+def decode_cursor(cursor):
+    """Позиции потоков из курсора; ValueError, если курсор неверный."""
+    try:
+        data = json.loads(b64decode(
+            cursor.encode(), altchars=b'-_', validate=True
+        ))
+        positions = {
+            name: (
+                datetime.fromisoformat(timestamp),
+                None if last_id is None else int(last_id),
+            )
+            for name, (timestamp, last_id) in data.items()
+        }
+    except (TypeError, AttributeError) as error:
+        raise ValueError(error)
+    if any(
+        timestamp.tzinfo is None for timestamp, _ in positions.values()
+    ):
+        raise ValueError('Время в курсоре без часового пояса.')
+    return positions
+
+
+def _after(queryset, time_field, position):
+    """Строки потока после позиции ``position``."""
+    if position is None:
+        return queryset
+    timestamp, last_id = position
+    if last_id is None:
+        return queryset.filter(**{f'{time_field}__gt': timestamp})
+    # Условие «время не раньше» отдельно от OR: по нему СУБД начинает
+    # чтение индекса с позиции, а не с начала.
+    return queryset.filter(
+        Q(**{f'{time_field}__gt': timestamp}) | Q(id__gt=last_id),
+        **{f'{time_field}__gte': timestamp},
+    )
+
+
+def portion(queryset, time_field, value_field, position, until, limit):
+    """Запрос порции потока: (время, id, рецепт) после ``position``."""
+    return _after(queryset, time_field, position).filter(
+        **{f'{time_field}__lte': until}
+    ).order_by(time_field, 'id').values_list(
+        time_field, 'id', value_field
+    )[:limit]
+
+
+def changes(user, positions, limit):
+    """Порция изменений после ``positions`` (None — с самого начала).
+
+    Возвращает словарь: ``changes`` — идентификаторы рецептов по
+    потокам, ``positions`` — новые позиции, ``has_more`` — остались ли
+    непрочитанные изменения, ``reset`` — нужна ли клиенту полная
+    синхронизация (тогда отдаётся её первая порция).
+    """
+    now = timezone.now()
+    until = now - timedelta(seconds=SYNC_COMMIT_LAG_SECONDS)
+    horizon = now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+    sources = streams(user)
+    reset = positions is None or any(
+        name in positions and positions[name][0] < horizon
+        for name, (queryset, _, _) in sources.items()
+        if queryset.model is Tombstone
+    )
+    if reset:
+        positions = {}
+    result = {
+        'changes': {},
+        'positions': {},
+        'has_more': False,
+        'reset': reset,
+    }
+    for name, (queryset, time_field, value_field) in sources.items():
+        position = positions.get(name)
+        if position is None and queryset.model is Tombstone:
+            # Клиенту, у которого нет этих данных, удалять нечего.
+            result['changes'][name] = []
+            result['positions'][name] = (until, None)
+            continue
+        rows = list(portion(
+            queryset, time_field, value_field, position, until, limit + 1
+        ))
+        if len(rows) > limit:
+            rows = rows[:limit]
+            result['has_more'] = True
+            result['positions'][name] = rows[-1][:2]
+        else:
+            result['positions'][name] = (until, None)
+        result['changes'][name] = [value for _, _, value in rows]
+    return result
+
+
+def prune_tombstones():
+    """Удаляет отметки старше срока хранения и возвращает их число."""
+    deleted, _ = Tombstone.objects.filter(
+        deleted_at__lt=timezone.now() - timedelta(
+            days=SYNC_TOMBSTONE_RETENTION_DAYS
+        )
+    ).delete()
+    return deleted
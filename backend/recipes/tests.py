@@ -0,0 +1,119 @@
+"""Тесты приложения рецептов."""
+
+import csv
+import io
+from unittest import mock
+
+from django.test import TestCase
+
+from users.models import User
+
+from .exports import export_response
+from .models import Ingredient, Recipe, RecipeIngredient, SimilarRecipe
+from .similarity import build_similar_recipes
+
+
+class SimilarRecipesTests(TestCase):
+    """Пересчёт похожих рецептов на небольшом каталоге."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Пять рецептов, два из них с яблоками."""
+        author = User.objects.create_user(
+            email='cook@example.com', username='cook',
+            first_name='Иван', last_name='Иванов', password='password',
+        )
+        ingredients = {
+            name: Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('мука', 'соль', 'яйца', 'яблоки', 'сыр', 'рис')
+        }
+        cls.recipes = {}
+        for name, names in (
+            ('шарлотка', ('мука', 'яйца', 'яблоки')),
+            ('яблочный пирог', ('мука', 'соль', 'яблоки')),
+            ('омлет', ('яйца', 'соль')),
+            ('сырники', ('мука', 'яйца', 'сыр')),
+            ('плов', ('рис', 'соль')),
+        ):
+            recipe = Recipe.objects.create(
+                author=author, name=name, text=name, cooking_time=10,
+                image='recipes/images/test.png',
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredients[item], amount=1
+                )
+                for item in names
+            )
+            cls.recipes[name] = recipe
+
+    def similar(self, name):
+        """Похожие на рецепт ``name`` по убыванию сходства."""
+        return list(
+            SimilarRecipe.objects.filter(
+                recipe=self.recipes[name]
+            ).order_by('-score').values_list('similar__name', flat=True)
+        )
+
+    def test_small_catalog_has_neighbors(self):
+        """В каталоге меньше 20 рецептов похожие находятся."""
+        build_similar_recipes(workers=1)
+        self.assertEqual(self.similar('шарлотка')[0], 'яблочный пирог')
+        self.assertIn('омлет', self.similar('плов'))
+        self.assertNotIn('шарлотка', self.similar('шарлотка'))
+
+    def test_recipes_without_rare_ingredients(self):
+        """Рецепты только из частых ингредиентов тоже получают похожих."""
+        with mock.patch(
+            'recipes.similarity.SIMILAR_RECIPES_MIN_RARE_COUNT', 0
+        ):
+            build_similar_recipes(workers=1)
+        self.assertEqual(self.similar('шарлотка')[0], 'яблочный пирог')
+        self.assertIn('омлет', self.similar('плов'))
+        for name in self.recipes:
+            self.assertTrue(self.similar(name), name)
+
+
+class ExportTests(TestCase):
+    """Выгрузка списков админки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Рецепты с названиями, похожими на формулы."""
+        author = User.objects.create_user(
+            email='author@example.com', username='@author',
+            first_name='Пётр', last_name='Петров', password='password',
+        )
+        for name in ('=HYPERLINK("http://example.com")', '-2+3', 'Суп'):
+            Recipe.objects.create(
+                author=author, name=name, text='\tтекст', cooking_time=5,
+                image='recipes/images/test.png',
+            )
+
+    def export(self, export_format):
+        """Тело выгрузки рецептов в формате ``export_format``."""
+        response = export_response(
+            Recipe.objects.order_by('id'),
+            ('name', 'author__username', 'text', 'cooking_time'),
+            export_format, 'recipes',
+        )
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_escapes_formulas(self):
+        """Ячейки CSV, похожие на формулы, начинаются с апострофа."""
+        rows = list(csv.reader(io.StringIO(self.export('csv'))))
+        self.assertEqual(
+            rows[1:],
+            [
+                [
+                    '\'=HYPERLINK("http://example.com")', "'@author",
+                    "'\tтекст", '5',
+                ],
+                ["'-2+3", "'@author", "'\tтекст", '5'],
+                ['Суп', "'@author", "'\tтекст", '5'],
+            ],
+        )
+
+    def test_jsonl_keeps_values(self):
+        """В JSONL значения выгружаются без изменений."""
+        self.assertIn('"name": "-2+3"', self.export('jsonl'))
@@ -0,0 +1,114 @@
+"""Оценки популярности рецептов с затуханием по времени.
+
+Каждое добавление в избранное или в корзину даёт рецепту вклад
+``weight * 2 ** (-age / half_life)``. Оценки хранятся в форме прямого
+затухания: вклад события записывается как
+``weight * 2 ** ((created_at - EPOCH) / half_life)``. Такая величина
+отличается от затухающей оценки на общий для всех рецептов множитель,
+поэтому порядок по ней не меняется со временем, а пересчёт сводится к
+прибавлению вкладов новых событий.
+
+Удаления из избранного и корзины при инкрементальном пересчёте не
+учитываются; их, как и события, записанные позже пересчёта, исправляет
+полный пересчёт за последние ``TRENDING_WINDOW_DAYS`` дней.
+"""
+
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from api.constants import (
+    TRENDING_FAVORITE_WEIGHT,
+    TRENDING_HALF_LIFE_DAYS,
+    TRENDING_SHOPPING_CART_WEIGHT,
+    TRENDING_WINDOW_DAYS,
+)
+
+from .models import Favorite, RecipeScore, ShoppingCart
+
+# Вклады растут вдвое за каждый период полураспада; float вмещает
+# около 1000 периодов, то есть примерно 19 лет от EPOCH.
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+HALF_LIFE = timedelta(days=TRENDING_HALF_LIFE_DAYS)
+SOURCES = (
+    (Favorite, TRENDING_FAVORITE_WEIGHT),
+    (ShoppingCart, TRENDING_SHOPPING_CART_WEIGHT),
+)
+BATCH_SIZE = 1000
+
+
+def weight(moment):
+    """Множитель прямого затухания для события в момент ``moment``."""
+    return 2 ** ((moment - EPOCH) / HALF_LIFE)
+
+
+def _deltas(since, until):
+    """Прирост оценок от событий в интервале (since, until].
+
+    События группируются по рецепту и часу в базе, поэтому объём
+    выборки не зависит от числа событий внутри часа.
+    """
+    deltas = {}
+    for model, event_weight in SOURCES:
+        events = model.objects.filter(created_at__lte=until)
+        if since is not None:
+            events = events.filter(created_at__gt=since)
+        buckets = events.annotate(
+            hour=TruncHour('created_at')
+        ).values('recipe_id', 'hour').annotate(
+            count=Count('id')
+        ).order_by().values_list('recipe_id', 'hour', 'count')
+        for recipe_id, hour, count in buckets.iterator(chunk_size=BATCH_SIZE):
+            deltas[recipe_id] = (
+                deltas.get(recipe_id, 0)
+                + event_weight * count * weight(hour)
+            )
+    return deltas
+
+
+def _apply(deltas, until):
+    """Прибавляет прирост к сохранённым оценкам пачками."""
+    recipe_ids = sorted(deltas)
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        batch = recipe_ids[start:start + BATCH_SIZE]
+        scores = RecipeScore.objects.in_bulk(batch)
+        for recipe_id in batch:
+            if recipe_id in scores:
+                scores[recipe_id].score += deltas[recipe_id]
+                scores[recipe_id].updated_at = until
+        RecipeScore.objects.bulk_update(
+            scores.values(), ['score', 'updated_at']
+        )
+        RecipeScore.objects.bulk_create(
+            RecipeScore(
+                recipe_id=recipe_id,
+                score=deltas[recipe_id],
+                updated_at=until,
+            )
+            for recipe_id in batch if recipe_id not in scores
+        )
+
+
+def recompute(full=False):
+    """Пересчитывает оценки и возвращает число изменённых рецептов.
+
+    Без ``full`` учитываются только события после предыдущего
+    пересчёта; с ``full`` оценки строятся заново по событиям
+    последних ``TRENDING_WINDOW_DAYS`` дней.
+    """
+    until = timezone.now()
+    with transaction.atomic():
+        if full:
+            RecipeScore.objects.all().delete()
+            since = until - timedelta(days=TRENDING_WINDOW_DAYS)
+        else:
+            since = RecipeScore.objects.aggregate(
+                last=Max('updated_at')
+            )['last']
+        deltas = _deltas(since, until)
+        _apply(deltas, until)
+    return len(deltas)